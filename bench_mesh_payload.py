@@ -0,0 +1,43 @@
+# Contenu de bench_mesh_payload.py
+# Banc d'essai de la prévisualisation 3D : taille de la figure envoyée au navigateur,
+# listes JSON de flottants contre tableaux typés base64 (float32 / uint32).
+# Seuls les octets sont mesurés ; le temps d'analyse côté navigateur n'est pas estimé ici.
+# Usage : python bench_mesh_payload.py [nombre de caissons ...]
+
+import sys
+import plotly.graph_objects as go
+from project_definitions import get_default_dims_19, get_default_door_props_19, get_default_drawer_props_19
+from utils import get_default_debit_data, get_default_shelf_props
+from scene_graph import compute_scene_origins
+from scene_preview import build_scene_batch
+
+def make_row_scene(n_cabinets):
+    """Rangée de caissons attachés à droite, une porte sur deux, deux étagères chacun."""
+    scene = []
+    for i in range(n_cabinets):
+        door = get_default_door_props_19(); door['has_door'] = i % 2 == 0
+        shelves = [get_default_shelf_props(), dict(get_default_shelf_props(), height=550.0)]
+        scene.append({
+            'dims': get_default_dims_19(), 'debit_data': get_default_debit_data(), 'name': f"Caisson {i}",
+            'parent_index': i - 1 if i else None, 'attachment_dir': 'right' if i else None, 'door_props': door,
+            'drawer_props': get_default_drawer_props_19(), 'shelves': shelves, 'material_body': 'Matière Corps'
+        })
+    return scene
+
+def measure(traces):
+    """(octets de la figure, octets des seuls sommets et indices)."""
+    payload = go.Figure(data=traces).to_json()
+    geometry = len(go.Figure(data=traces).update_traces(text=None).to_json()) - len(go.Figure(data=[go.Mesh3d() for _ in traces]).to_json())
+    return len(payload), geometry
+
+def main(sizes):
+    print(f"{'caissons':>9} {'mode':>8} {'octets':>10} {'géométrie':>10}")
+    for n in sizes:
+        scene = make_row_scene(n)
+        batch = build_scene_batch(scene, compute_scene_origins(scene, 0.001), 0.001, 100.0, True)
+        for mode, binary in (('json', False), ('base64', True)):
+            size, geometry = measure(batch.traces(binary=binary))
+            print(f"{n:>9} {mode:>8} {size:>10} {geometry:>10}")
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10, 50, 200])
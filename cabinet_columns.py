@@ -0,0 +1,100 @@
+# Contenu de cabinet_columns.py
+# Représentation colonnaire (NumPy) de la scène : une ligne par caisson, une ligne par étagère,
+# une ligne par pièce de structure (debit_data). Toutes les cotes de débit sont obtenues par quelques
+# expressions vectorisées ; parts_engine.calculate_scene_parts_columnar en tire la feuille de débit.
+
+import numpy as np
+import pandas as pd
+from hardware_catalog import get_default_catalog
+
+def _objects(values):
+    # Tableau d'objets Python (libellés, matières) : indexable par un tableau d'indices comme les colonnes numériques
+    out = np.empty(len(values), dtype=object)
+    out[:] = values
+    return out
+
+def build_cabinet_columns(scene_cabinets, catalog=None):
+    """Convertit la liste de caissons (dicts imbriqués) en tableaux NumPy."""
+    n = len(scene_cabinets)
+    dims = [c['dims'] for c in scene_cabinets]
+    doors = [c.get('door_props', {}) for c in scene_cabinets]
+    drawers = [c.get('drawer_props', {}) for c in scene_cabinets]
+    catalog = catalog or get_default_catalog()
+
+    def col(values, dtype=float):
+        return np.fromiter(values, dtype=dtype, count=n)
+
+    # Hauteur du dos de tiroir : une recherche catalogue par système, pas par caisson
+    system_codes, systems = pd.factorize(pd.Series([drp.get('drawer_tech_type', 'K') for drp in drawers], dtype=object))
+    back_heights = np.array([catalog.drawer_back_height(s) for s in systems], dtype=float)
+
+    shelves = [(i, j, s) for i, c in enumerate(scene_cabinets) for j, s in enumerate(c.get('shelves', []))]
+    m = len(shelves)
+    pieces = [(i, p) for i, c in enumerate(scene_cabinets) for p in c.get('debit_data', [])]
+
+    return {
+        'count': n,
+        'L': col(d['L_raw'] for d in dims),
+        'W': col(d['W_raw'] for d in dims),
+        'H': col(d['H_raw'] for d in dims),
+        't_lr': col(d['t_lr_raw'] for d in dims),
+        't_fb': col(d['t_fb_raw'] for d in dims),
+        't_tb': col(d['t_tb_raw'] for d in dims),
+        'material_body': _objects([c.get('material_body', 'Matière Corps') for c in scene_cabinets]),
+        # Porte
+        'has_door': col((bool(dp.get('has_door', False)) for dp in doors), dtype=bool),
+        'door_single': col((dp.get('door_type') == 'single' for dp in doors), dtype=bool),
+        'door_floor_length': col((dp.get('door_model') == 'floor_length' for dp in doors), dtype=bool),
+        'door_gap': col(dp.get('door_gap', 2.0) for dp in doors),
+        'door_thickness': col(dp.get('door_thickness', 19.0) for dp in doors),
+        'door_material': _objects([dp.get('material', 'Matière Porte') for dp in doors]),
+        # Tiroir
+        'has_drawer': col((bool(drp.get('has_drawer', False)) for drp in drawers), dtype=bool),
+        'drawer_gap': col(drp.get('drawer_gap', 2.0) for drp in drawers),
+        'drawer_face_H': col(drp.get('drawer_face_H_raw', 150.0) for drp in drawers),
+        'drawer_face_thickness': col(drp.get('drawer_face_thickness', 19.0) for drp in drawers),
+        'drawer_back_H': back_heights[system_codes] if n else np.empty(0),
+        'drawer_material': _objects([drp.get('material', 'Matière Tiroir') for drp in drawers]),
+        # Étagères (une ligne par étagère)
+        'shelf_cabinet': np.fromiter((i for i, _, _ in shelves), dtype=np.int64, count=m),
+        'shelf_index': np.fromiter((j for _, j, _ in shelves), dtype=np.int64, count=m),
+        'shelf_type': _objects([s.get('shelf_type', 'mobile') for _, _, s in shelves]),
+        'shelf_thickness': np.fromiter((float(s.get('thickness', 19.0)) for _, _, s in shelves), dtype=float, count=m),
+        'shelf_material': _objects([s.get('material', 'Matière Étagère') for _, _, s in shelves]),
+        # Pièces de structure (une ligne par pièce, colonnes de debit_data telles quelles)
+        'piece_cabinet': np.fromiter((i for i, _ in pieces), dtype=np.int64, count=len(pieces)),
+        'pieces': pd.DataFrame.from_records([p for _, p in pieces]),
+    }
+
+def compute_panel_dimensions(columns, foot_height=80.0):
+    """
+    Cotes de débit de tous les caissons en une passe.
+    Les tableaux 'shelf_*' sont indexés par étagère, les autres par caisson.
+    """
+    L, W, H = columns['L'], columns['W'], columns['H']
+    t_lr = columns['t_lr']
+    L_traverse = L - 2 * t_lr
+
+    door_gap = columns['door_gap']
+    door_H = H - (2 * door_gap)
+    door_H = np.where(columns['door_floor_length'], door_H + foot_height, door_H)
+    door_W = np.where(columns['door_single'], L - (2 * door_gap), (L - 2 * door_gap) / 2)
+
+    shelf_cab = columns['shelf_cabinet']
+    shelf_L = np.where(columns['shelf_type'] == 'fixe', L_traverse[shelf_cab], L_traverse[shelf_cab] - 2.0)
+
+    return {
+        'L_traverse': L_traverse,
+        'H_side': H,
+        'fond_vertical': H - 2.0,
+        'fond_horizontal': L - 2.0,
+        'door_H': door_H,
+        'door_W': door_W,
+        'door_qty': np.where(columns['door_single'], 1, 2),
+        'drawer_face_H': columns['drawer_face_H'],
+        'drawer_face_W': L - (2 * columns['drawer_gap']),
+        'drawer_back_H': columns['drawer_back_H'],
+        'drawer_back_W': L - 2 * t_lr - 40,
+        'shelf_L': shelf_L,
+        'shelf_W': W[shelf_cab] - 10.0,
+    }
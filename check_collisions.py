@@ -0,0 +1,135 @@
+# Contenu de check_collisions.py
+# Contrôle d'équivalence de detect_collisions (hachage spatial, séries de crémaillère, dichotomie) avec
+# l'algorithme d'origine (toutes les paires, liste de dicts développée) : mêmes conflits, dans le même ordre.
+# Entrées : panneaux aléatoires (points et crémaillères en séries) et plans d'usinage de caissons aléatoires,
+# passés en HoleSet et en listes de dicts.
+# Usage : python check_collisions.py [nombre de tirages] [graine]
+
+import sys
+import math
+import random
+from hole_set import HoleSet
+from machining_logic import detect_collisions
+from machining_plans import build_cabinet_machining_plan
+from project_definitions import get_default_dims_19, get_default_door_props_19, get_default_drawer_props_19
+from utils import get_default_debit_data, get_default_shelf_props
+
+def reference_detect_collisions(holes_list):
+    """Algorithme d'origine, en O(n²), conservé tel quel comme référence."""
+    conflicts = []
+    processed_pairs = set()
+    mobile_zones = {}
+    for h in holes_list:
+        src_name = h.get('source_name', 'Inconnu')
+        src_id = h.get('group_id', 'unk')
+        if src_id not in mobile_zones and h.get('source') == 'shelf_mobile':
+            mobile_zones[src_id] = {'min': h['y'], 'max': h['y'], 'name': src_name, 'type': 'shelf_mobile'}
+        elif src_id in mobile_zones:
+            mobile_zones[src_id]['min'] = min(mobile_zones[src_id]['min'], h['y'])
+            mobile_zones[src_id]['max'] = max(mobile_zones[src_id]['max'], h['y'])
+    for h in holes_list:
+        h_gid = h.get('group_id')
+        for gid, zone in mobile_zones.items():
+            if h_gid != gid and zone['min'] - 5 <= h['y'] <= zone['max'] + 5:
+                conflict_id = f"zone_{gid}_hole_{h['y']}"
+                if conflict_id not in processed_pairs:
+                    src_trou = h.get('source_name', 'Autre usinage')
+                    conflicts.append({'msg': f"Conflit de Zone : {src_trou} (Y={h['y']:.1f}) tombe dans la crémaillère de {zone['name']}",
+                                      'overlap_dist': 32.0, 'y': h['y']})
+                    processed_pairs.add(conflict_id)
+    n = len(holes_list)
+    for i in range(n):
+        h1 = holes_list[i]
+        for j in range(i + 1, n):
+            h2 = holes_list[j]
+            src1, src2 = h1.get('source'), h2.get('source')
+            if src1 == src2 and src1 == 'shelf_mobile': continue
+            dist = math.sqrt((h1['x'] - h2['x'])**2 + (h1['y'] - h2['y'])**2)
+            if dist < 10.0:
+                pair_key = tuple(sorted((str(h1), str(h2))))
+                if pair_key not in processed_pairs:
+                    name1 = h1.get('source_name', 'Usinage 1')
+                    name2 = h2.get('source_name', 'Usinage 2')
+                    conflicts.append({'msg': f"Chevauchement entre {name1} et {name2} à Y={h1['y']:.1f} (Dist: {dist:.1f}mm)",
+                                      'overlap_dist': 10.0 - dist, 'y': h1['y']})
+                    processed_pairs.add(pair_key)
+    return conflicts
+
+def random_panel(rng):
+    """Points isolés (mobiles ou non, avec ou sans groupe / nom) entrecoupés de crémaillères en séries."""
+    blocks = []
+    for _ in range(rng.randint(1, 4)):
+        points = []
+        for _ in range(rng.randint(0, 20)):
+            h = {'type': rng.choice(['vis', 'tourillon']), 'x': rng.choice([37.0, 40.0, 300.0, rng.uniform(0, 400)]),
+                 'y': rng.choice([float(rng.randint(0, 40) * 8), rng.uniform(0, 400)]), 'diam_str': "⌀3"}
+            r = rng.random()
+            if r < 0.4: h['source'] = 'shelf_mobile'
+            elif r < 0.6: h['source'] = 'structure'
+            if rng.random() < 0.5: h['group_id'] = rng.choice(['a', 'b', 5, None, 'unk'])
+            if rng.random() < 0.5: h['source_name'] = rng.choice(['A', 'B'])
+            points.append(h)
+        blocks.append(HoleSet.from_dicts(points))
+        if rng.random() < 0.6:
+            blocks.append(HoleSet.rack([(rng.choice([50.0, 40.0, 58.0, 200.0]), rng.randint(0, 8))], 37.0, rng.choice([300.0, 40.0]),
+                                       source=rng.choice(['shelf_mobile', 'shelf_mobile', 'structure']),
+                                       source_name=rng.choice([None, 'R']), group_id=rng.choice([None, 'a', 'g'])))
+    return HoleSet.concat(blocks)
+
+def random_cabinet(rng):
+    dims = get_default_dims_19()
+    dims.update(L_raw=rng.choice([400.0, 600.0, 800.0]), W_raw=rng.choice([300.0, 350.0, 450.0, 560.0, 620.0]),
+                H_raw=rng.choice([720.0, 800.0, 2100.0, 2400.0]))
+    door = get_default_door_props_19()
+    door.update(has_door=rng.random() < 0.5, door_opening=rng.choice(['left', 'right']), door_model=rng.choice(['standard', 'floor_length']))
+    drawer = get_default_drawer_props_19()
+    drawer.update(has_drawer=rng.random() < 0.5, drawer_tech_type=rng.choice('KMND'), drawer_bottom_offset=rng.choice([0.0, 100.0, 300.0]))
+    shelves = []
+    for _ in range(rng.randint(0, 4)):
+        s = get_default_shelf_props()
+        s.update(height=rng.choice([150.0, 300.0, 450.0, 600.0]), shelf_type=rng.choice(['mobile', 'fixe']),
+                 mobile_machining_type=rng.choice(['full_height', '5_holes_centered', 'custom_n_m']),
+                 custom_holes_above=rng.randint(0, 3), custom_holes_below=rng.randint(0, 3))
+        shelves.append(s)
+    return {'dims': dims, 'debit_data': get_default_debit_data(), 'door_props': door, 'drawer_props': drawer, 'shelves': shelves}
+
+def check(holes, label):
+    """Compare les trois appels ; retourne un message en cas d'écart, None sinon."""
+    expected = reference_detect_collisions(holes.to_dicts())
+    for kind, got in (('HoleSet', detect_collisions(holes)), ('dicts', detect_collisions(holes.to_dicts()))):
+        if got != expected:
+            return f"{label} ({kind}) : {len(got)} conflits au lieu de {len(expected)}"
+    return None
+
+def main(n_draws=500, seed=0):
+    rng = random.Random(seed)
+    n_panels = n_conflicts = 0
+    for draw in range(n_draws):
+        panels = [(f"tirage {draw}, panneau aléatoire", random_panel(rng))]
+        plan = build_cabinet_machining_plan(random_cabinet(rng), draw)
+        panels += [(f"tirage {draw}, {p['name']}", p['face_holes']) for p in plan if len(p['face_holes'])]
+        for label, holes in panels:
+            error = check(holes, label)
+            if error:
+                print("ÉCART :", error)
+                return 1
+            n_panels += 1
+            n_conflicts += len(detect_collisions(holes))
+    # group_id None contre group_id absent : zones distinctes, et exemption des trous sans groupe par la zone None
+    holes = [dict(h, type='tourillon', diam_str="⌀5") for h in (
+        {'x': 37.0, 'y': 50.0, 'source': 'shelf_mobile', 'group_id': None}, {'x': 37.0, 'y': 82.0, 'source': 'shelf_mobile'},
+        {'x': 300.0, 'y': 52.0, 'source': 'structure'}, {'x': 300.0, 'y': 84.0, 'source': 'structure', 'group_id': None})]
+    for label, case in (("group_id None", holes), ("group_id None seul", holes[:1] + holes[2:])):
+        if HoleSet.from_dicts(case).to_dicts() != case:
+            print(f"ÉCART : {label}, aller-retour HoleSet / dicts")
+            return 1
+        error = check(HoleSet.from_dicts(case), label)
+        if error:
+            print("ÉCART :", error)
+            return 1
+    print(f"OK : {n_panels} panneaux, {n_conflicts} conflits identiques (HoleSet et listes de dicts)")
+    return 0
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    sys.exit(main(*args))
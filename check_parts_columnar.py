@@ -0,0 +1,81 @@
+# Contenu de check_parts_columnar.py
+# Contrôle d'équivalence de la feuille de débit colonnaire (calculate_scene_parts_columnar) avec
+# calculate_scene_parts : mêmes lignes, même ordre, mêmes valeurs, mêmes cotes d'étagères.
+# Entrées : scènes aléatoires (portes, tiroirs, étagères, lignes de debit_data renommées ou ajoutées),
+# puis un temps de calcul comparé sur une grande scène.
+# Usage : python check_parts_columnar.py [nombre de tirages] [graine] [caissons de la grande scène]
+
+import sys
+import time
+import random
+import pandas as pd
+from parts_engine import calculate_scene_parts, calculate_scene_parts_columnar
+from project_definitions import get_default_dims_19, get_default_door_props_19, get_default_drawer_props_19
+from utils import get_default_debit_data, get_default_shelf_props
+
+def random_cabinet(rng):
+    dims = get_default_dims_19()
+    dims.update(L_raw=rng.choice([400.0, 600.0, 800.0]), W_raw=rng.choice([300.0, 560.0]), H_raw=rng.choice([720.0, 2100.0]),
+                t_lr_raw=rng.choice([16.0, 19.0]), t_tb_raw=rng.choice([16.0, 19.0]))
+    door = get_default_door_props_19()
+    door.update(has_door=rng.random() < 0.5, door_type=rng.choice(['single', 'double']), door_model=rng.choice(['standard', 'floor_length']),
+                door_gap=rng.choice([2.0, 3.0]))
+    if rng.random() < 0.3: door['material'] = 'Chêne'
+    drawer = get_default_drawer_props_19()
+    drawer.update(has_drawer=rng.random() < 0.5, drawer_tech_type=rng.choice('KMND'), drawer_gap=rng.choice([2.0, 4.0]))
+    shelves = []
+    for _ in range(rng.randint(0, 4)):
+        s = get_default_shelf_props()
+        s.update(shelf_type=rng.choice(['mobile', 'fixe']), thickness=rng.choice([16.0, 19.0]))
+        shelves.append(s)
+    debit = get_default_debit_data()
+    if rng.random() < 0.2: debit[0]["Référence Pièce"] = "Traverse Bas renforcée (Tb)"
+    if rng.random() < 0.2: debit.append({"Lettre": "F", "Référence Pièce": "Tasseau (T)", "Qté": 2, "Longueur (mm)": 300.0, "Largeur (mm)": 40.0,
+                                         "Usinage": "", "Note": "sur mesure"})
+    if rng.random() < 0.1: debit = debit[:3]
+    cab = {'dims': dims, 'debit_data': debit, 'door_props': door, 'drawer_props': drawer, 'shelves': shelves}
+    if rng.random() < 0.5: cab['material_body'] = rng.choice(['Mélaminé blanc', 'Contreplaqué'])
+    return cab
+
+def random_scene(rng, n_cabinets):
+    return {'scene_cabinets': [random_cabinet(rng) for _ in range(n_cabinets)], 'foot_height': rng.choice([80.0, 100.0])}
+
+def check(scene, label):
+    """Compare les deux calculs ; retourne un message en cas d'écart, None sinon."""
+    parts, shelf_dims = calculate_scene_parts(scene)
+    cut_list, shelf_dims_col = calculate_scene_parts_columnar(scene)
+    expected = pd.DataFrame(parts)
+    if shelf_dims_col != shelf_dims:
+        return f"{label} : cotes d'étagères différentes"
+    if expected.empty and cut_list.empty:
+        return None
+    try:
+        pd.testing.assert_frame_equal(cut_list, expected, check_like=True)
+    except AssertionError as e:
+        return f"{label} : {e}"
+    return None
+
+def main(n_draws=300, seed=0, n_large=5000):
+    rng = random.Random(seed)
+    n_rows = 0
+    for draw in range(n_draws):
+        scene = random_scene(rng, rng.randint(0, 12))
+        error = check(scene, f"tirage {draw}")
+        if error:
+            print("ÉCART :", error)
+            return 1
+        n_rows += len(calculate_scene_parts(scene)[0])
+    scene = random_scene(rng, n_large)
+    error = check(scene, "grande scène")
+    if error:
+        print("ÉCART :", error)
+        return 1
+    t0 = time.perf_counter(); pd.DataFrame(calculate_scene_parts(scene)[0]); t1 = time.perf_counter()
+    calculate_scene_parts_columnar(scene); t2 = time.perf_counter()
+    print(f"OK : {n_draws} scènes, {n_rows} pièces identiques")
+    print(f"{n_large} caissons : dicts + DataFrame {t1 - t0:.3f} s, colonnaire {t2 - t1:.3f} s")
+    return 0
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    sys.exit(main(*args))
@@ -0,0 +1,82 @@
+# Contenu de collision_scan.py
+# Contrôle des collisions sur tous les panneaux percés de tous les caissons de la scène.
+# Mêmes règles que detect_collisions ; résultats mémoïsés par état de caisson.
+# L'interface contrôle sa scène en séquentiel ; la répartition sur des processus est réservée aux traitements par lot.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from hardware_catalog import get_catalog, get_default_catalog
+from machining_logic import detect_collisions
+from machining_plans import cabinet_state_hash, get_cabinet_machining_plan
+from parts_engine import DEFAULT_FOOT_HEIGHT
+from shared_cache import LRUCache
+
+SCAN_CACHE_SIZE = 1024
+_scan_cache = LRUCache(max_entries=SCAN_CACHE_SIZE)
+
+def scan_cabinet_collisions(cabinet, cab_idx, foot_height=DEFAULT_FOOT_HEIGHT, catalog=None):
+    """Conflits de chaque panneau percé d'un caisson : liste de (role, conflits), dans l'ordre du plan."""
+    result = []
+    for panel in get_cabinet_machining_plan(cabinet, cab_idx, foot_height, catalog):
+        if len(panel['face_holes']) == 0: continue
+        conflicts = detect_collisions(panel['face_holes'], cabinet.get('shelves', []), panel_name=f"Caisson {cab_idx} - {panel['name']}")
+        if conflicts: result.append((panel['role'], conflicts))
+    return result
+
+def _scan_job(job):
+    cabinet, cab_idx, foot_height, catalog = job
+    return scan_cabinet_collisions(cabinet, cab_idx, foot_height, catalog)
+
+def _collision_index(results):
+    index = {}
+    for i, result in enumerate(results):
+        for role, conflicts in result:
+            index[(i, role)] = conflicts
+    return index
+
+def scan_project_collisions(scene_cabinets, foot_height=DEFAULT_FOOT_HEIGHT, catalog=None):
+    """
+    Contrôle tous les caissons de la scène, dans le processus courant (appelé à chaque exécution Streamlit).
+    Retourne l'index {(cab_idx, role): [conflits]} des panneaux en conflit (ordre : caissons puis panneaux).
+    Seuls les caissons absents du cache (modifiés ou évincés) sont recalculés.
+    """
+    catalog = catalog or get_default_catalog()
+    results = []
+    for i, cab in enumerate(scene_cabinets):
+        key = (i, cabinet_state_hash(cab, foot_height), catalog.catalog_id)
+        results.append(_scan_cache.get_or_build(key, lambda: scan_cabinet_collisions(cab, i, foot_height, catalog)))
+    return _collision_index(results)
+
+def scan_projects_collisions_batch(scenes, max_workers=None):
+    """
+    Contrôle des collisions de plusieurs scènes (ex. un lot de projets, hors de l'interface).
+    Retourne un index par scène (voir scan_project_collisions).
+    max_workers=1 : calcul séquentiel dans le processus courant, sinon caissons répartis sur des processus.
+    """
+    scenes = list(scenes)
+    jobs, counts = [], []
+    for scene in scenes:
+        cabinets = scene.get('scene_cabinets', [])
+        foot_height = scene.get('foot_height', DEFAULT_FOOT_HEIGHT)
+        catalog = get_catalog(scene.get('hardware_catalog'))
+        jobs.extend((cab, i, foot_height, catalog) for i, cab in enumerate(cabinets))
+        counts.append(len(cabinets))
+    if max_workers == 1 or len(jobs) <= 1:
+        results = [_scan_job(job) for job in jobs]
+    else:
+        workers = max_workers or os.cpu_count() or 1
+        chunksize = max(1, len(jobs) // (4 * workers))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_scan_job, jobs, chunksize=chunksize))
+    indexes, start = [], 0
+    for n in counts:
+        indexes.append(_collision_index(results[start:start + n]))
+        start += n
+    return indexes
+
+def get_panel_conflicts(index, cab_idx, role):
+    return index.get((cab_idx, role), [])
+
+def get_cabinet_conflicts(index, cab_idx):
+    """Conflits de tous les panneaux d'un caisson, dans l'ordre du plan."""
+    return [c for (i, _), conflicts in index.items() if i == cab_idx for c in conflicts]
@@ -4,6 +4,11 @@ import re
 import base64
 import os
 import io
+import math
+import heapq
+from collections import deque
+from functools import lru_cache
+from hole_set import as_hole_set, TYPES
 
 try:
     from PIL import Image
@@ -11,7 +16,9 @@ except ImportError:
     def load_image_base64(filename): return None
 
 if 'Image' in locals():
+    @lru_cache(maxsize=None)
     def load_image_base64(filename):
+        """Image en data-URI PNG, décodée une fois par processus (None si absente ou illisible)."""
         candidates = [filename]
         script_dir = os.path.dirname(os.path.abspath(__file__))
         candidates.append(os.path.join(script_dir, filename))
@@ -31,44 +38,106 @@ if 'Image' in locals():
         except Exception as e:
             return None
 
+@lru_cache(maxsize=256)
+def _hatch_segments(width, height, density):
+    """
+    Hachures à 45° d'un rectangle [0, width] x [0, height] : tableau (n, 4) des segments (x0, y0, x1, y1).
+    Droites y = x + c, c = -width + k * density jusqu'à height ; chaque droite est coupée aux bords du rectangle.
+    """
+    c = -width + density * np.arange(int(np.floor((height + width) / density)) + 1)
+    c = c[c <= height]
+    # Intersections candidates avec les bords gauche, droit, bas et haut
+    X = np.column_stack([np.zeros_like(c), np.full_like(c, width), -c, height - c])
+    Y = np.column_stack([c, width + c, np.zeros_like(c), np.full_like(c, height)])
+    valid = np.column_stack([(0 <= c) & (c <= height), (0 <= width + c) & (width + c <= height),
+                             (0 <= -c) & (-c <= width), (0 <= height - c) & (height - c <= width)])
+    # Extrémités = plus petit et plus grand point valide dans l'ordre (x, y)
+    x0 = np.where(valid, X, np.inf).min(axis=1)
+    y0 = np.where(valid & (X == x0[:, None]), Y, np.inf).min(axis=1)
+    x1 = np.where(valid, X, -np.inf).max(axis=1)
+    y1 = np.where(valid & (X == x1[:, None]), Y, -np.inf).max(axis=1)
+    keep = valid.any(axis=1) & ((x0 != x1) | (y0 != y1))
+    segments = np.column_stack([x0, y0, x1, y1])[keep]
+    segments.setflags(write=False)
+    return segments
+
 def create_hatch_lines(x0, y0, x1, y1, density=20):
-    lines_x, lines_y = [], []
-    xmin, xmax = min(x0, x1), max(x0, x1)
-    ymin, ymax = min(y0, y1), max(y0, y1)
-    start_c = ymin - xmax
-    end_c = ymax - xmin
-    c = start_c
-    while c <= end_c:
-        pts = []
-        if ymin <= xmin + c <= ymax: pts.append((xmin, xmin + c))
-        if ymin <= xmax + c <= ymax: pts.append((xmax, xmax + c))
-        if xmin <= ymin - c <= xmax: pts.append((ymin - c, ymin))
-        if xmin <= ymax - c <= xmax: pts.append((ymax - c, ymax))
-        pts = sorted(list(set(pts)))
-        if len(pts) >= 2:
-            lines_x.extend([pts[0][0], pts[-1][0], None])
-            lines_y.extend([pts[0][1], pts[-1][1], None])
-        c += density
+    """Hachures du rectangle (x0, y0)-(x1, y1) : listes x et y, segments séparés par None."""
+    xmin, ymin = min(x0, x1), min(y0, y1)
+    seg = _hatch_segments(float(abs(x1 - x0)), float(abs(y1 - y0)), float(density))
+    n = len(seg)
+    lines_x, lines_y = [None] * (3 * n), [None] * (3 * n)
+    lines_x[0::3] = (seg[:, 0] + xmin).tolist(); lines_x[1::3] = (seg[:, 2] + xmin).tolist()
+    lines_y[0::3] = (seg[:, 1] + ymin).tolist(); lines_y[1::3] = (seg[:, 3] + ymin).tolist()
     return lines_x, lines_y
 
 def calculate_stagger_levels(coords, min_dist=45):
+    """
+    Niveau de chaque cote (0 = ligne la plus proche) : la plus basse ligne dont la dernière cote est à au moins min_dist.
+    Répartition d'intervalles : lignes occupées dans l'ordre de leur dernière cote, lignes libérées dans un tas.
+    """
     if not coords: return []
-    indices = np.argsort(coords)
     levels = [0] * len(coords)
-    last_pos_at_level = {}
-    for i in indices:
+    busy = deque() # (dernière cote, niveau), cotes croissantes
+    free = []      # niveaux libérés (tas)
+    n_levels = 0
+    for i in np.argsort(coords):
         val = coords[i]
-        lvl = 0
-        while True:
-            last_val = last_pos_at_level.get(lvl, -99999)
-            if (val - last_val) >= min_dist:
-                levels[i] = lvl
-                last_pos_at_level[lvl] = val
-                break
-            lvl += 1
+        while busy and (val - busy[0][0]) >= min_dist:
+            heapq.heappush(free, busy.popleft()[1])
+        if free: lvl = heapq.heappop(free)
+        else: lvl = n_levels; n_levels += 1
+        levels[i] = lvl
+        busy.append((val, lvl))
     return levels
 
-def add_pro_dimension(fig, x0, y0, x1, y1, text_val, offset_dist, axis='x', color="black", font_size=11, line_dash='solid', xanchor=None, yanchor=None):
+# Contour des trous : polygone (cercle unité fermé) ; les marqueurs Plotly ont une taille en pixels, pas en mm
+HOLE_SEGMENTS = 32
+_UNIT_CIRCLE = np.exp(1j * np.linspace(0, 2*np.pi, HOLE_SEGMENTS + 1))
+SHAPE_LINE_WIDTH = 2 # Épaisseur par défaut du contour des formes Plotly (ancien rendu des trous)
+
+class SheetBatch:
+    """
+    Éléments d'une feuille d'usinage, ajoutés à la figure en une fois :
+    segments regroupés par style (une trace Scatter par style, segments séparés par des trous NaN),
+    trous regroupés par (type, diamètre) en contours pleins, annotations et formes en une seule mise à jour du layout.
+    """
+    def __init__(self):
+        self.lines = {}  # (couleur, épaisseur, tirets) -> ([x], [y])
+        self.holes = {}  # (type, diamètre) -> (remplissage, [cx], [cy], [r])
+        self.annotations = []
+        self.shapes = []
+        self.images = []
+
+    def line(self, x0, y0, x1, y1, color="black", width=1.0, dash='solid'):
+        xs, ys = self.lines.setdefault((color, width, dash), ([], []))
+        xs.extend((x0, x1, None)); ys.extend((y0, y1, None))
+
+    def circle(self, key, cx, cy, r, fill):
+        _, xs, ys, rs = self.holes.setdefault(key, (fill, [], [], []))
+        xs.append(cx); ys.append(cy); rs.append(r)
+
+    def annotation(self, **kwargs):
+        self.annotations.append(kwargs)
+
+    def shape(self, **kwargs):
+        self.shapes.append(kwargs)
+
+    def flush(self, fig, **layout):
+        """Ajoute les traces puis met à jour le layout (formes, annotations, images et réglages 'layout') en un appel."""
+        for (color, width, dash), (xs, ys) in self.lines.items():
+            fig.add_trace(go.Scatter(x=np.array(xs, dtype=float), y=np.array(ys, dtype=float), mode='lines',
+                                     line=dict(color=color, width=width, dash=dash), hoverinfo='skip', showlegend=False))
+        for (h_type, diam_str), (fill, cx, cy, r) in self.holes.items():
+            pts = (np.array(cx) + 1j * np.array(cy))[:, None] + np.array(r)[:, None] * _UNIT_CIRCLE[None, :]
+            pts = np.hstack([pts, np.full((len(pts), 1), np.nan)]).ravel()
+            fig.add_trace(go.Scatter(x=pts.real, y=pts.imag, mode='lines', fill='toself', fillcolor=fill,
+                                     line=dict(color="black", width=SHAPE_LINE_WIDTH), name=f"{h_type} {diam_str}",
+                                     hoverinfo='skip', showlegend=False))
+        fig.update_layout(shapes=list(fig.layout.shapes) + self.shapes, annotations=list(fig.layout.annotations) + self.annotations,
+                          images=list(fig.layout.images) + self.images, **layout)
+
+def add_pro_dimension(sheet, x0, y0, x1, y1, text_val, offset_dist, axis='x', color="black", font_size=11, line_dash='solid', xanchor=None, yanchor=None):
     tick_len = 5
     line_width = 0.8
     ext_overshoot = 5
@@ -78,22 +147,28 @@ def add_pro_dimension(fig, x0, y0, x1, y1, text_val, offset_dist, axis='x', colo
     if yanchor is None: yanchor = 'middle'
     if axis == 'x':
         y_dim = y0 + offset_dist if offset_dist != 0 else y0
-        fig.add_shape(type="line", x0=x0, y0=y0, x1=x0, y1=y_dim + (np.sign(offset_dist)*ext_overshoot), line=dict(color=color, width=0.5, dash=line_dash))
-        fig.add_shape(type="line", x0=x1, y0=y1, x1=x1, y1=y_dim + (np.sign(offset_dist)*ext_overshoot), line=dict(color=color, width=0.5, dash=line_dash))
-        fig.add_shape(type="line", x0=x0, y0=y_dim, x1=x1, y1=y_dim, line=dict(color=color, width=line_width, dash=line_dash))
-        fig.add_shape(type="line", x0=x0, y0=y_dim-tick_len, x1=x0, y1=y_dim+tick_len, line=dict(color=color, width=1.2, dash='solid'))
-        fig.add_shape(type="line", x0=x1, y0=y_dim-tick_len, x1=x1, y1=y_dim+tick_len, line=dict(color=color, width=1.2, dash='solid'))
+        sheet.line(x0, y0, x0, y_dim + (np.sign(offset_dist)*ext_overshoot), color=color, width=0.5, dash=line_dash)
+        sheet.line(x1, y1, x1, y_dim + (np.sign(offset_dist)*ext_overshoot), color=color, width=0.5, dash=line_dash)
+        sheet.line(x0, y_dim, x1, y_dim, color=color, width=line_width, dash=line_dash)
+        sheet.line(x0, y_dim-tick_len, x0, y_dim+tick_len, color=color, width=1.2, dash='solid')
+        sheet.line(x1, y_dim-tick_len, x1, y_dim+tick_len, color=color, width=1.2, dash='solid')
         text_y_pos = y_dim + (np.sign(offset_dist) * 15)
-        fig.add_annotation(x=(x0+x1)/2, y=text_y_pos, text=str(text_val), showarrow=False, font=text_font, bgcolor=text_bg, yanchor=yanchor, xanchor=xanchor)
+        sheet.annotation(x=(x0+x1)/2, y=text_y_pos, text=str(text_val), showarrow=False, font=text_font, bgcolor=text_bg, yanchor=yanchor, xanchor=xanchor)
     elif axis == 'y':
         x_dim = x0 + offset_dist
-        fig.add_shape(type="line", x0=x0, y0=y0, x1=x_dim + (np.sign(offset_dist)*ext_overshoot), y1=y0, line=dict(color=color, width=0.5, dash=line_dash))
-        fig.add_shape(type="line", x0=x1, y0=y1, x1=x_dim + (np.sign(offset_dist)*ext_overshoot), y1=y1, line=dict(color=color, width=0.5, dash=line_dash))
-        fig.add_shape(type="line", x0=x_dim, y0=y0, x1=x_dim, y1=y1, line=dict(color=color, width=line_width, dash=line_dash))
-        fig.add_shape(type="line", x0=x_dim-tick_len, y0=y0, x1=x_dim+tick_len, y1=y0, line=dict(color=color, width=1.2, dash='solid'))
-        fig.add_shape(type="line", x0=x_dim-tick_len, y0=y1, x1=x_dim+tick_len, y1=y1, line=dict(color=color, width=1.2, dash='solid'))
+        sheet.line(x0, y0, x_dim + (np.sign(offset_dist)*ext_overshoot), y0, color=color, width=0.5, dash=line_dash)
+        sheet.line(x1, y1, x_dim + (np.sign(offset_dist)*ext_overshoot), y1, color=color, width=0.5, dash=line_dash)
+        sheet.line(x_dim, y0, x_dim, y1, color=color, width=line_width, dash=line_dash)
+        sheet.line(x_dim-tick_len, y0, x_dim+tick_len, y0, color=color, width=1.2, dash='solid')
+        sheet.line(x_dim-tick_len, y1, x_dim+tick_len, y1, color=color, width=1.2, dash='solid')
         text_x_pos = x_dim + (np.sign(offset_dist) * 15)
-        fig.add_annotation(x=text_x_pos, y=(y0+y1)/2, text=str(text_val), showarrow=False, textangle=-90, font=text_font, bgcolor=text_bg, xanchor=xanchor, yanchor=yanchor)
+        sheet.annotation(x=text_x_pos, y=(y0+y1)/2, text=str(text_val), showarrow=False, textangle=-90, font=text_font, bgcolor=text_bg, xanchor=xanchor, yanchor=yanchor)
+
+@lru_cache(maxsize=None)
+def hole_radius(diam_str, default):
+    """Rayon lu dans le libellé de diamètre ('⌀8/20' -> 4.0), valeur par défaut si illisible."""
+    try: return float(re.findall(r"[\d\.]+", diam_str)[0])/2
+    except: return default
 
 def check_label_overlap(new_pos, existing_positions, min_dist=35):
     nx, ny = new_pos
@@ -102,11 +177,32 @@ def check_label_overlap(new_pos, existing_positions, min_dist=35):
         if dist < min_dist: return True
     return False
 
+class LabelGrid:
+    """Positions des étiquettes placées, hachées par cellule de côté min_dist : un test ne regarde que les 9 cellules voisines."""
+    def __init__(self, min_dist=35):
+        self.min_dist = min_dist
+        self.cells = {} # (i, j) -> [(x, y)]
+
+    def _cell(self, pos):
+        return (math.floor(pos[0] / self.min_dist), math.floor(pos[1] / self.min_dist))
+
+    def overlaps(self, pos):
+        i, j = self._cell(pos)
+        near = [p for di in (-1, 0, 1) for dj in (-1, 0, 1) for p in self.cells.get((i + di, j + dj), ())]
+        return check_label_overlap(pos, near, self.min_dist)
+
+    def add(self, pos):
+        self.cells.setdefault(self._cell(pos), []).append(pos)
+
+# Décalages (ax, ay) de la flèche, du plus proche au plus éloigné du trou
+LABEL_CANDIDATES = [(30, -30), (30, 30), (-30, 30), (-30, -30), (50, -50), (50, 50), (-50, 50),
+                    (-50, -50), (70, -70), (70, 70), (-70, 70), (-70, -70)]
+
 def get_smart_label_pos(cx, cy, r, existing_labels):
-    candidates = [(30, -30), (30, 30), (-30, 30), (-30, -30), (50, -50), (50, 50), (-50, 50)]
-    for ax, ay in candidates:
+    """Premier décalage dont l'étiquette ne chevauche aucune de existing_labels (LabelGrid) ; sinon (30, -30)."""
+    for ax, ay in LABEL_CANDIDATES:
         test_pos = (cx + ax, cy - ay)
-        if not check_label_overlap(test_pos, existing_labels):
+        if not existing_labels.overlaps(test_pos):
             return ax, ay, test_pos
     return 30, -30, (cx+30, cy+30)
 
@@ -133,10 +229,71 @@ def group_holes_for_dimensioning(y_vals):
         else: result.append({'start': grp[0], 'end': grp[0], 'count': 1, 'type': 'single'})
     return result
 
+def group_runs_for_dimensioning(runs):
+    """
+    Même résultat que group_holes_for_dimensioning, directement à partir de séries (start, step, count).
+    Retourne None si les séries ne sont pas au pas de 32 ou sont trop proches : il faut alors développer les points.
+    """
+    spans = set()
+    for start, step, count in runs:
+        if count == 0: continue
+        if step != 32.0: return None
+        spans.add((round(float(start), 1), round(float(start + step * (count - 1)), 1), int(count)))
+    result = []
+    for start, end, count in sorted(spans):
+        if result and start - result[-1]['end'] < 33.0: return None
+        if count >= 2: result.append({'start': start, 'end': end, 'count': count, 'type': 'rack'})
+        else: result.append({'start': start, 'end': start, 'count': 1, 'type': 'single'})
+    return result
+
+CART_Y_MIN = 0.01
+CART_Y_MAX = 0.09 
+CART_BG_COLOR = "#f9f9f0"
+CART_FIELDS = [(0.1, "Projet"), (0.35, "Désignation"), (0.6, "Quantité"), (0.775, "Date")]
+LOGO_FILE = "logo.png"
+
+@lru_cache(maxsize=None)
+def get_sheet_template():
+    """
+    Éléments fixes de toutes les feuilles, construits une fois par processus : cadre et colonnes du cartouche,
+    titres et emplacements des champs, logo, mise en page A4. Les dicts sont partagés : ne pas les modifier.
+    """
+    LINE_COLOR = "black"
+    shapes = [dict(type="rect", xref="paper", yref="paper", x0=0.05, x1=0.95, y0=CART_Y_MIN, y1=CART_Y_MAX, line=dict(color=LINE_COLOR, width=1), fillcolor=CART_BG_COLOR, layer="below")]
+    col_pcts = [0.2, 0.5, 0.7, 0.85]
+    for pct in col_pcts:
+        x_pos = 0.05 + (0.90 * pct)
+        shapes.append(dict(type="line", xref="paper", yref="paper", x0=x_pos, x1=x_pos, y0=CART_Y_MIN, y1=CART_Y_MAX, line=dict(color=LINE_COLOR, width=0.5)))
+
+    y_center = (CART_Y_MIN + CART_Y_MAX) / 2
+    fields = []
+    for pct_center, title in CART_FIELDS:
+        x_c = 0.05 + (0.90 * pct_center)
+        fields.append((
+            dict(xref="paper", yref="paper", x=x_c, y=y_center + 0.015, text=f"<b>{title}</b>", showarrow=False, font=dict(size=11), xanchor="center", yanchor="middle"),
+            dict(xref="paper", yref="paper", x=x_c, y=y_center - 0.015, showarrow=False, font=dict(size=13), xanchor="center", yanchor="middle"),
+        ))
+
+    logo_x_c = 0.05 + (0.90 * 0.925)
+    logo_base64 = load_image_base64(LOGO_FILE)
+    images, logo_annotations = [], []
+    if logo_base64:
+        images.append(dict(source=logo_base64, xref="paper", yref="paper", x=logo_x_c, y=y_center, sizex=0.10, sizey=0.07, xanchor="center", yanchor="middle", layer="above"))
+    else:
+        logo_annotations.append(dict(xref="paper", yref="paper", x=logo_x_c, y=y_center, text="LOGO<br>MANQUANT", showarrow=False, font=dict(color="red", size=8), xanchor="center", yanchor="middle"))
+
+    margin_val = 50
+    layout = dict(plot_bgcolor="white", paper_bgcolor="white", width=1123, height=794,
+                  margin=dict(l=margin_val, r=margin_val, t=50, b=30), showlegend=False)
+    return {'shapes': shapes, 'fields': fields, 'images': images, 'logo_annotations': logo_annotations, 'layout': layout}
+
 def draw_machining_view_pro_final(panel_name, L, W, T, unit_str, project_info, 
                                  chants, face_holes_list=[], tranche_longue_holes_list=[], 
                                  tranche_cote_holes_list=[], center_cutout_props=None):
+    face_holes = as_hole_set(face_holes_list)
+    tranche_cote_holes = as_hole_set(tranche_cote_holes_list)
     fig = go.Figure()
+    sheet = SheetBatch()
     
     line_color = "black"
     dim_line_color = "black"
@@ -151,13 +308,15 @@ def draw_machining_view_pro_final(panel_name, L, W, T, unit_str, project_info,
     bounds_x = [0, L]
     bounds_y = [0, W]
     
-    fig.add_shape(type="rect", x0=0, y0=0, x1=L, y1=W, line=dict(color=line_color, width=1.5), fillcolor="white", layer="below")
+    sheet.shape(type="rect", x0=0, y0=0, x1=L, y1=W, line=dict(color=line_color, width=1.5), fillcolor="white", layer="below")
     
+    # Les quatre tranches en une trace (contours séparés par None), leurs hachures en une autre
+    tranche_x, tranche_y, hatch_x, hatch_y = [], [], [], []
     def draw_tranche(tx, ty, hatch_key):
-        fig.add_trace(go.Scatter(x=tx, y=ty, fill="toself", fillcolor="#f9f9f9", line=dict(color=line_color, width=1), hoverinfo="none", showlegend=False, mode='lines'))
+        tranche_x.extend(tx + [None]); tranche_y.extend(ty + [None])
         if chants.get(hatch_key):
             hx, hy = create_hatch_lines(min(tx), min(ty), max(tx), max(ty), density=HATCH_SPACING)
-            fig.add_trace(go.Scatter(x=hx, y=hy, mode='lines', line=dict(color=HATCH_COLOR, width=1), hoverinfo='skip', showlegend=False))
+            hatch_x.extend(hx); hatch_y.extend(hy)
 
     y_tb_0, y_tb_1 = -MARGIN_DIMS, -MARGIN_DIMS - TRANCHE_THICK
     y_th_0, y_th_1 = W + MARGIN_DIMS, W + MARGIN_DIMS + TRANCHE_THICK
@@ -168,18 +327,20 @@ def draw_machining_view_pro_final(panel_name, L, W, T, unit_str, project_info,
     draw_tranche([0, L, L, 0, 0], [y_th_0, y_th_0, y_th_1, y_th_1, y_th_0], "Chant Arrière")
     draw_tranche([x_tg_0, x_tg_1, x_tg_1, x_tg_0, x_tg_0], [0, 0, W, W, 0], "Chant Gauche")
     draw_tranche([x_td_0, x_td_1, x_td_1, x_td_0, x_td_0], [0, 0, W, W, 0], "Chant Droit")
+    fig.add_trace(go.Scatter(x=tranche_x, y=tranche_y, fill="toself", fillcolor="#f9f9f9", line=dict(color=line_color, width=1), hoverinfo="none", showlegend=False, mode='lines'))
+    if hatch_x: fig.add_trace(go.Scatter(x=hatch_x, y=hatch_y, mode='lines', line=dict(color=HATCH_COLOR, width=1), hoverinfo='skip', showlegend=False))
     
     bounds_y.extend([y_tb_1, y_th_1])
     bounds_x.extend([x_tg_1, x_td_1])
 
-    add_pro_dimension(fig, L+20, y_tb_0, L+20, y_tb_1, f"{T:.0f}", 20, axis='y', xanchor='center', yanchor='middle')
-    add_pro_dimension(fig, L+20, y_th_0, L+20, y_th_1, f"{T:.0f}", 20, axis='y', xanchor='center', yanchor='middle')
-    add_pro_dimension(fig, x_tg_0, W+20, x_tg_1, W+20, f"{T:.0f}", 20, axis='x', xanchor='center', yanchor='middle')
-    add_pro_dimension(fig, x_td_0, W+20, x_td_1, W+20, f"{T:.0f}", 20, axis='x', xanchor='center', yanchor='middle')
+    add_pro_dimension(sheet, L+20, y_tb_0, L+20, y_tb_1, f"{T:.0f}", 20, axis='y', xanchor='center', yanchor='middle')
+    add_pro_dimension(sheet, L+20, y_th_0, L+20, y_th_1, f"{T:.0f}", 20, axis='y', xanchor='center', yanchor='middle')
+    add_pro_dimension(sheet, x_tg_0, W+20, x_tg_1, W+20, f"{T:.0f}", 20, axis='x', xanchor='center', yanchor='middle')
+    add_pro_dimension(sheet, x_td_0, W+20, x_td_1, W+20, f"{T:.0f}", 20, axis='x', xanchor='center', yanchor='middle')
     
     dist_global = MARGIN_DIMS + TRANCHE_THICK + 50
-    add_pro_dimension(fig, 0, W, L, W, f"{L:.0f}", dist_global, axis='x', font_size=14, yanchor='bottom')
-    add_pro_dimension(fig, 0, 0, 0, W, f"{W:.0f}", -dist_global, axis='y', font_size=14, xanchor='right')
+    add_pro_dimension(sheet, 0, W, L, W, f"{L:.0f}", dist_global, axis='x', font_size=14, yanchor='bottom')
+    add_pro_dimension(sheet, 0, 0, 0, W, f"{W:.0f}", -dist_global, axis='y', font_size=14, xanchor='right')
     
     bounds_x.append(-dist_global - 50)
     bounds_y.append(W + dist_global + 50)
@@ -189,102 +350,108 @@ def draw_machining_view_pro_final(panel_name, L, W, T, unit_str, project_info,
         cOff = center_cutout_props['offset_top']
         x0, x1 = (L-cW)/2, (L-cW)/2 + cW
         y1, y0 = W-cOff, W-cOff-cH
-        fig.add_shape(type="rect", x0=x0, y0=y0, x1=x1, y1=y1, line=dict(color="black", width=1, dash="dash"), layer="above")
-        add_pro_dimension(fig, x0, y1, x1, y1, f"{cW:.0f}", -30, axis='x')
-        add_pro_dimension(fig, x0, y0, x0, y1, f"{cH:.0f}", -30, axis='y')
+        sheet.shape(type="rect", x0=x0, y0=y0, x1=x1, y1=y1, line=dict(color="black", width=1, dash="dash"), layer="above")
+        add_pro_dimension(sheet, x0, y1, x1, y1, f"{cW:.0f}", -30, axis='x')
+        add_pro_dimension(sheet, x0, y0, x0, y1, f"{cH:.0f}", -30, axis='y')
+
+    face_types = [t if t is not None else 'autre' for t in face_holes.type_names()]
+    face_x, face_y = face_holes.x.tolist(), face_holes.y.tolist()
 
-    if face_holes_list:
+    if len(face_holes):
         holes_by_func = {}
-        for h in face_holes_list:
-            full_type = h.get('type', 'autre')
-            key = full_type 
-            if key not in holes_by_func: holes_by_func[key] = []
-            holes_by_func[key].append(h['y'])
+        for t, y in zip(face_types, face_y):
+            holes_by_func.setdefault(t, []).append(y)
+        runs = face_holes.runs
+        runs_by_func = {}
+        for r, t in enumerate(TYPES.decode(runs['type'])):
+            runs_by_func.setdefault(t if t is not None else 'autre', []).append((runs['start'][r], runs['step'][r], runs['count'][r]))
         
         x_dim_start = -40 
         layer_width = 50 
-        sorted_keys = sorted(holes_by_func.keys())
+        sorted_keys = sorted(set(holes_by_func) | set(runs_by_func))
         
         for idx, k in enumerate(sorted_keys):
-            y_vals = holes_by_func[k]
             current_x_dim = x_dim_start - (idx * layer_width)
-            groups = group_holes_for_dimensioning(y_vals)
+            groups = None
+            if k not in holes_by_func: groups = group_runs_for_dimensioning(runs_by_func[k])
+            if groups is None:
+                y_vals = holes_by_func.get(k, []) + [y for r in runs_by_func.get(k, []) for y in np.repeat(r[0] + r[1] * np.arange(r[2]), 2).tolist()]
+                groups = group_holes_for_dimensioning(y_vals)
             prev_end = 0
             for grp in groups:
                 dist_gap = grp['start'] - prev_end
                 if dist_gap > 1.0:
-                    add_pro_dimension(fig, current_x_dim, prev_end, current_x_dim, grp['start'], f"{dist_gap:.0f}", -10, axis='y', line_dash='dot')
+                    add_pro_dimension(sheet, current_x_dim, prev_end, current_x_dim, grp['start'], f"{dist_gap:.0f}", -10, axis='y', line_dash='dot')
                 if grp['type'] == 'rack':
                     span = grp['end'] - grp['start']
                     nb_inter = grp['count'] - 1
                     label = f"{nb_inter}x 32 = {span:.0f}"
-                    add_pro_dimension(fig, current_x_dim, grp['start'], current_x_dim, grp['end'], label, -10, axis='y', line_dash='dot')
+                    add_pro_dimension(sheet, current_x_dim, grp['start'], current_x_dim, grp['end'], label, -10, axis='y', line_dash='dot')
                     prev_end = grp['end']
                 else:
                     prev_end = grp['start']
             bounds_x.append(current_x_dim - 20)
 
-        unique_x = sorted(list(set([round(h['x'], 1) for h in face_holes_list])))
+        run_x = np.concatenate([runs['x_front'], runs['x_back']]).tolist()
+        unique_x = sorted(set(round(x, 1) for x in face_x + run_x))
         y_dim_base = -40
         x_levels = calculate_stagger_levels(unique_x, min_dist=45)
         
-        fig.add_shape(type="line", x0=0, y0=y_dim_base, x1=L, y1=y_dim_base, line=dict(color="black", width=0.5))
+        sheet.line(0, y_dim_base, L, y_dim_base, color="black", width=0.5)
         for i, x_pos in enumerate(unique_x):
-            fig.add_shape(type="line", x0=x_pos, y0=0, x1=x_pos, y1=y_dim_base, line=dict(color="black", width=0.5, dash='dot'))
-            fig.add_shape(type="line", x0=x_pos, y0=y_dim_base-3, x1=x_pos, y1=y_dim_base+3, line=dict(color="black", width=1.2))
+            sheet.line(x_pos, 0, x_pos, y_dim_base, color="black", width=0.5, dash='dot')
+            sheet.line(x_pos, y_dim_base-3, x_pos, y_dim_base+3, color="black", width=1.2)
             lvl = x_levels[i]
             text_y = y_dim_base - 15 - (lvl * 20)
-            fig.add_annotation(x=x_pos, y=text_y, text=f"{x_pos:.0f}", showarrow=False, font=dict(size=10, color="black"), xanchor="center", yanchor="middle")
+            sheet.annotation(x=x_pos, y=text_y, text=f"{x_pos:.0f}", showarrow=False, font=dict(size=10, color="black"), xanchor="center", yanchor="middle")
             bounds_y.append(text_y)
 
     annotated_types = set()
-    existing_labels = [] 
-    for h in face_holes_list:
-        x, y = h['x'], h['y']
-        diam_str = h.get('diam_str', '⌀8')
-        r = 4.0
-        try: r = float(re.findall(r"[\d\.]+", diam_str)[0])/2
-        except: pass
-        fill = "black" if 'vis' in h.get('type', '') else "white"
-        fig.add_shape(type="circle", x0=x-r, y0=y-r, x1=x+r, y1=y+r, line_color="black", fillcolor=fill, layer="above")
-        type_key = f"{h['type']}_{diam_str}"
+    existing_labels = LabelGrid()
+    all_face_holes = face_holes.expanded()
+    face_types = [t if t is not None else 'autre' for t in all_face_holes.type_names()]
+    face_diams = [d if d is not None else '⌀8' for d in all_face_holes.diam_strs()]
+    for x, y, h_type, diam_str in zip(all_face_holes.x.tolist(), all_face_holes.y.tolist(), face_types, face_diams):
+        r = hole_radius(diam_str, 4.0)
+        fill = "black" if 'vis' in h_type else "white"
+        sheet.circle((h_type, diam_str), x, y, r, fill)
+        type_key = f"{h_type}_{diam_str}"
         if type_key not in annotated_types:
             ax, ay, final_pos = get_smart_label_pos(x, y, r, existing_labels)
-            fig.add_annotation(x=x, y=y, text=f"<b>{diam_str}</b>", showarrow=True, arrowwidth=1, arrowhead=2, ax=ax, ay=ay, font=dict(size=12, color="black"), bgcolor="white", bordercolor="black")
+            sheet.annotation(x=x, y=y, text=f"<b>{diam_str}</b>", showarrow=True, arrowwidth=1, arrowhead=2, ax=ax, ay=ay, font=dict(size=12, color="black"), bgcolor="white", bordercolor="black")
             annotated_types.add(type_key)
-            existing_labels.append(final_pos)
+            existing_labels.add(final_pos)
 
     # --- TROUS DE TRANCHE (Traverses & Etagères Fixes) ---
-    if tranche_cote_holes_list:
-        y_locs = sorted(list(set([round(h['y'], 1) for h in tranche_cote_holes_list])))
+    if len(tranche_cote_holes):
+        tranche_y = tranche_cote_holes.y.tolist()
+        y_locs = sorted(set(round(y, 1) for y in tranche_y))
         prev_y = 0
         for y_pos in y_locs:
             dist = y_pos - prev_y
             if dist > 0:
-                add_pro_dimension(fig, x_td_1, prev_y, x_td_1, y_pos, f"{dist:.0f}", 40, axis='y', line_dash='dot')
+                add_pro_dimension(sheet, x_td_1, prev_y, x_td_1, y_pos, f"{dist:.0f}", 40, axis='y', line_dash='dot')
             prev_y = y_pos
             
         annotated_tranche_types = set()
         
-        for h in tranche_cote_holes_list:
-            y = h['y']
+        tranche_types = [t if t is not None else 'unk' for t in tranche_cote_holes.type_names()]
+        tranche_diams = [d if d is not None else '⌀8' for d in tranche_cote_holes.diam_strs()]
+        for y, h_type, diam_str in zip(tranche_y, tranche_types, tranche_diams):
             gx = (x_tg_0 + x_tg_1) / 2
             dx = (x_td_0 + x_td_1) / 2
             
-            diam_str = h.get('diam_str', '⌀8')
-            r = 3.0
-            try: r = float(re.findall(r"[\d\.]+", diam_str)[0])/2
-            except: pass
+            r = hole_radius(diam_str, 3.0)
             
-            fill = "black" if 'vis' in h.get('type', '') else "white"
+            fill = "black" if 'vis' in h_type else "white"
             
-            fig.add_shape(type="circle", x0=gx-r, y0=y-r, x1=gx+r, y1=y+r, line_color="black", fillcolor=fill, layer="above")
-            fig.add_shape(type="circle", x0=dx-r, y0=y-r, x1=dx+r, y1=y+r, line_color="black", fillcolor=fill, layer="above")
+            sheet.circle((h_type, diam_str), gx, y, r, fill)
+            sheet.circle((h_type, diam_str), dx, y, r, fill)
             
-            type_key = f"tranche_{h.get('type','unk')}_{diam_str}"
+            type_key = f"tranche_{h_type}_{diam_str}"
             if type_key not in annotated_tranche_types:
                 # STYLE "PRO" APPLIQUÉ ICI (Cadre + Flèche Fine)
-                fig.add_annotation(
+                sheet.annotation(
                     x=gx, y=y, 
                     text=f"<b>{diam_str}</b>", 
                     showarrow=True, 
@@ -296,52 +463,22 @@ def draw_machining_view_pro_final(panel_name, L, W, T, unit_str, project_info,
                 )
                 annotated_tranche_types.add(type_key)
 
-    CART_Y_MIN = 0.01
-    CART_Y_MAX = 0.09 
-    CART_BG_COLOR = "#f9f9f0"
-    LINE_COLOR = "black"
-    
-    fig.add_shape(type="rect", xref="paper", yref="paper", x0=0.05, x1=0.95, y0=CART_Y_MIN, y1=CART_Y_MAX, line=dict(color=LINE_COLOR, width=1), fillcolor=CART_BG_COLOR, layer="below")
-    
-    col_pcts = [0.2, 0.5, 0.7, 0.85]
-    for pct in col_pcts:
-        x_pos = 0.05 + (0.90 * pct)
-        fig.add_shape(type="line", xref="paper", yref="paper", x0=x_pos, x1=x_pos, y0=CART_Y_MIN, y1=CART_Y_MAX, line=dict(color=LINE_COLOR, width=0.5))
-    
-    def add_paper_txt(pct_center, title, val):
-        x_c = 0.05 + (0.90 * pct_center)
-        y_center = (CART_Y_MIN + CART_Y_MAX) / 2
-        y_title = y_center + 0.015
-        y_val = y_center - 0.015
-        fig.add_annotation(xref="paper", yref="paper", x=x_c, y=y_title, text=f"<b>{title}</b>", showarrow=False, font=dict(size=11), xanchor="center", yanchor="middle")
-        fig.add_annotation(xref="paper", yref="paper", x=x_c, y=y_val, text=str(val), showarrow=False, font=dict(size=13), xanchor="center", yanchor="middle")
-
-    add_paper_txt(0.1, "Projet", project_info['project_name'])
-    add_paper_txt(0.35, "Désignation", panel_name)
-    add_paper_txt(0.6, "Quantité", project_info['quantity'])
-    add_paper_txt(0.775, "Date", project_info['date'])
-    
-    logo_x_c = 0.05 + (0.90 * 0.925)
-    logo_y_c = (CART_Y_MIN + CART_Y_MAX) / 2
-    logo_file = "logo.png"
-    logo_base64 = load_image_base64(logo_file)
-    
-    if logo_base64:
-        fig.add_layout_image(dict(source=logo_base64, xref="paper", yref="paper", x=logo_x_c, y=logo_y_c, sizex=0.10, sizey=0.07, xanchor="center", yanchor="middle", layer="above"))
-    else:
-        fig.add_annotation(xref="paper", yref="paper", x=logo_x_c, y=logo_y_c, text="LOGO<br>MANQUANT", showarrow=False, font=dict(color="red", size=8), xanchor="center", yanchor="middle")
+    template = get_sheet_template()
+    sheet.shapes.extend(template['shapes'])
+    values = [project_info['project_name'], panel_name, project_info['quantity'], project_info['date']]
+    for (title_ann, value_ann), val in zip(template['fields'], values):
+        sheet.annotation(**title_ann)
+        sheet.annotation(**value_ann, text=str(val))
+    sheet.annotations.extend(template['logo_annotations'])
+    sheet.images.extend(template['images'])
 
-    margin_val = 50
     f_min_x, f_max_x = min(bounds_x) - 50, max(bounds_x) + 50
     f_min_y, f_max_y = min(bounds_y) - 50, max(bounds_y) + 50
 
-    fig.update_layout(
+    sheet.flush(fig,
         title=dict(text=f"FEUILLE D'USINAGE : {panel_name}", x=0.5, y=0.98),
-        plot_bgcolor="white", paper_bgcolor="white",
-        width=1123, height=794,
-        margin=dict(l=margin_val, r=margin_val, t=50, b=30),
         xaxis=dict(visible=False, range=[f_min_x, f_max_x]),
         yaxis=dict(visible=False, range=[f_min_y, f_max_y], scaleanchor="x", scaleratio=1, domain=[0.10, 1.0]),
-        showlegend=False
+        **template['layout']
     )
     return fig
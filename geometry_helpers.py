@@ -1,5 +1,6 @@
 # Contenu de geometry_helpers.py
 import numpy as np
+from functools import lru_cache
 import plotly.graph_objects as go
 
 # --- NOUVELLE FONCTION ---
@@ -84,6 +85,54 @@ def make_plotly_mesh(verts, tris, name="mesh", color='lightblue', opacity=0.5, s
     )
     return mesh
 
+# Cube unité partagé par la génération en lot : sommets mis à l'échelle et translatés par diffusion
+_UNIT_CUBE_VERTS = make_cuboid_vertices(1.0, 1.0, 1.0)
+_UNIT_CUBE_TRIS = cuboid_triangles()
+# Coefficients (ligne, colonne) de cos et sin dans rotation_matrix, par axe
+_ROTATION_TERMS = {
+    'z': ([(0, 0), (1, 1)], [((0, 1), -1), ((1, 0), 1)]),
+    'y': ([(0, 0), (2, 2)], [((0, 2), 1), ((2, 0), -1)]),
+    'x': ([(1, 1), (2, 2)], [((1, 2), -1), ((2, 1), 1)]),
+}
+
+def rotation_matrices(angles_deg, axes):
+    """Matrices de rotation (N, 3, 3), une par couple (angle, axe) ; mêmes conventions que rotation_matrix."""
+    angles_rad = np.radians(np.asarray(angles_deg, dtype=float))
+    c, s = np.cos(angles_rad), np.sin(angles_rad)
+    axes = np.asarray(axes)
+    R = np.tile(np.identity(3), (len(angles_rad), 1, 1))
+    for axis, (cos_terms, sin_terms) in _ROTATION_TERMS.items():
+        m = axes == axis
+        for r, col in cos_terms: R[m, r, col] = c[m]
+        for (r, col), sign in sin_terms: R[m, r, col] = sign * s[m]
+    return R
+
+def cuboid_batch(sizes, origins, angles=None, axes=None, pivots=None):
+    """
+    Sommets (8N, 3) et triangles (12N, 3) de N cuboïdes, en quelques opérations NumPy.
+    sizes, origins : (N, 3). Rotation optionnelle : angles (N,) en degrés (0 : pas de rotation),
+    axes (N,) parmi 'x', 'y', 'z', pivots (N, 3) (par défaut l'origine de chaque cuboïde).
+    """
+    sizes = np.asarray(sizes, dtype=float).reshape(-1, 3)
+    origins = np.asarray(origins, dtype=float).reshape(-1, 3)
+    n = len(sizes)
+    verts = origins[:, None, :] + _UNIT_CUBE_VERTS[None, :, :] * sizes[:, None, :]
+    if angles is not None:
+        angles = np.asarray(angles, dtype=float)
+        rot = angles != 0
+        if rot.any():
+            pivot = (origins if pivots is None else np.asarray(pivots, dtype=float).reshape(-1, 3))[rot][:, None, :]
+            R = rotation_matrices(angles[rot], np.asarray(axes)[rot])
+            verts[rot] = np.matmul(verts[rot] - pivot, R) + pivot
+    tris = (_UNIT_CUBE_TRIS[None, :, :] + 8 * np.arange(n)[:, None, None]).reshape(-1, 3)
+    return verts.reshape(-1, 3), tris
+
+def rotate_vertices(verts, angle_deg, axis, pivot):
+    """Rotation des sommets (N, 3) autour du point pivot."""
+    pivot = np.array(pivot)
+    # Déplacer le pivot en (0,0,0), appliquer (N, 3) @ R, puis revenir
+    return (verts - pivot) @ rotation_matrix(angle_deg, axis) + pivot
+
 # --- MODIFIÉ : Ajout des paramètres de rotation ---
 def cuboid_mesh_for(L, W, H, origin=(0,0,0), name="outer", color='lightblue', opacity=0.5, showlegend=False,
                     rotation_angle=0, rotation_axis='z', rotation_pivot=None):
@@ -97,27 +146,7 @@ def cuboid_mesh_for(L, W, H, origin=(0,0,0), name="outer", color='lightblue', op
     
     # 2. Appliquer la rotation si nécessaire
     if rotation_angle != 0:
-        
-        # Définir le point de pivot
-        if rotation_pivot is None:
-            # Si aucun pivot n'est fourni, pivoter autour de l'origine du cube
-            pivot = np.array(origin) 
-        else:
-            pivot = np.array(rotation_pivot)
-            
-        # Obtenir la matrice de rotation
-        R = rotation_matrix(rotation_angle, rotation_axis)
-        
-        # Appliquer la rotation :
-        # 1. Déplacer les sommets pour que le pivot soit à (0,0,0)
-        verts_translated = verts - pivot
-        
-        # 2. Appliquer la rotation (multiplication matricielle)
-        # (N, 3) @ (3, 3) -> (N, 3)
-        verts_rotated = verts_translated @ R
-        
-        # 3. Redéplacer les sommets à leur position d'origine + rotation
-        verts = verts_rotated + pivot
+        verts = rotate_vertices(verts, rotation_angle, rotation_axis, origin if rotation_pivot is None else rotation_pivot)
         
     # 3. Créer le maillage Plotly
     return make_plotly_mesh(verts, tris, name=name, color=color, opacity=opacity, showlegend=showlegend)
@@ -128,76 +157,163 @@ def center_origin_for_plot(outer):
     L,W,H = outer
     return (-L/2, -W/2, 0)
 
-# --- NOUVELLE FONCTION (Inchangée) ---
+# Axe du cylindre -> index (dans x, y, z) des coordonnées locales (u, v) du cercle et w de la hauteur
+_CYLINDER_AXES = {'z': [0, 1, 2], 'x': [1, 2, 0], 'y': [2, 0, 1]}
+
+@lru_cache(maxsize=None)
+def _cylinder_topology(n_points):
+    """
+    Cercle unité (n_points, 2) et triangles (6 * n_points, 3) d'un cylindre, calculés une fois par n_points.
+    Sommets : 0 à n_points-1 (cercle bas), n_points à 2*n_points-1 (cercle haut), 2*n_points (centre bas), 2*n_points+1 (centre haut).
+    """
+    theta = np.linspace(0, 2*np.pi, n_points)
+    ring = np.column_stack([np.cos(theta), np.sin(theta)])
+    i = np.arange(n_points)
+    j = (i + 1) % n_points # Prochain point, boucle
+    ti, tj = i + n_points, j + n_points
+    cb, ct = np.full(n_points, 2*n_points), np.full(n_points, 2*n_points + 1)
+    # Par segment : capuchon du bas, capuchon du haut, puis les triangles des côtés
+    tris = np.stack([
+        [cb, i, j], [ct, ti, tj],
+        [i, j, ti], [ti, tj, tj],
+        [i, j, tj], [tj, j, i],
+    ]).transpose(2, 0, 1).reshape(-1, 3)
+    ring.setflags(write=False); tris.setflags(write=False)
+    return ring, tris
+
+def cylinder_batch(origins, heights, radii, n_points=20, axis='z'):
+    """
+    Sommets et triangles de N cylindres (pieds, quincaillerie ronde) : topologie en cache, seuls les sommets sont calculés.
+    origins : (N, 3) centres des bases ; heights, radii : (N,) ; axis : axe des cylindres ('z' : vertical).
+    """
+    ring, tris = _cylinder_topology(n_points)
+    perm = _CYLINDER_AXES[axis]
+    local = np.asarray(origins, dtype=float).reshape(-1, 3)[:, perm]
+    heights = np.broadcast_to(np.asarray(heights, dtype=float), len(local))
+    radii = np.broadcast_to(np.asarray(radii, dtype=float), len(local))
+    n_inst, n_verts = len(local), 2*n_points + 2
+    top = local[:, 2] + heights
+    verts = np.empty((n_inst, n_verts, 3))
+    verts[:, :n_points, :2] = radii[:, None, None] * ring[None] + local[:, None, :2]
+    verts[:, n_points:2*n_points, :2] = verts[:, :n_points, :2]
+    verts[:, :n_points, 2] = local[:, 2:3]
+    verts[:, n_points:2*n_points, 2] = top[:, None]
+    verts[:, 2*n_points] = local
+    verts[:, 2*n_points + 1, :2] = local[:, :2]
+    verts[:, 2*n_points + 1, 2] = top
+    world = np.empty_like(verts)
+    world[..., perm] = verts
+    all_tris = (tris[None] + n_verts * np.arange(n_inst)[:, None, None]).reshape(-1, 3)
+    return world.reshape(-1, 3), all_tris
+
+def make_cylinder_mesh(origin, height, radius, n_points=20):
+    """Sommets (N, 3) et triangles (M, 3) d'un cylindre vertical posé en origin."""
+    return cylinder_batch([origin], [height], [radius], n_points)
+
 def cylinder_mesh_for(origin, height, radius, n_points=20, color='grey', name="cyl", showlegend=False):
     """Crée un maillage Mesh3d pour un cylindre."""
-    x0, y0, z0 = origin
-    
-    # Créer les points du cercle
-    theta = np.linspace(0, 2*np.pi, n_points)
-    a = radius * np.cos(theta)
-    b = radius * np.sin(theta)
-    
-    # Points du bas (z=z0)
-    points_bottom = np.array([a + x0, b + y0, np.full(n_points, z0)])
-    # Points du haut (z=z0 + height)
-    points_top = np.array([a + x0, b + y0, np.full(n_points, z0 + height)])
-    
-    # Points centraux
-    center_bottom = np.array([[x0], [y0], [z0]])
-    center_top = np.array([[x0], [y0], [z0 + height]])
-    
-    # Concaténer tous les points
-    # Ordre: 0 à n_points-1 (cercle bas)
-    #        n_points à 2*n_points-1 (cercle haut)
-    #        2*n_points (centre bas)
-    #        2*n_points+1 (centre haut)
-    verts = np.concatenate([
-        points_bottom.T, 
-        points_top.T,
-        center_bottom.T,
-        center_top.T
-    ], axis=0)
-    
+    verts, tris = make_cylinder_mesh(origin, height, radius, n_points)
     x, y, z = verts[:,0], verts[:,1], verts[:,2]
-    
-    # Indices
-    idx_bottom = np.arange(0, n_points)
-    idx_top = np.arange(n_points, 2*n_points)
-    idx_center_bottom = 2*n_points
-    idx_center_top = 2*n_points + 1
-    
-    i_tris, j_tris, k_tris = [], [], []
-    
-    # Créer les triangles
-    for i in range(n_points):
-        idx_i = i
-        idx_j = (i + 1) % n_points # Prochain point, boucle
-        
-        # 1. Capuchon du bas
-        i_tris.append(idx_center_bottom)
-        j_tris.append(idx_i)
-        k_tris.append(idx_j)
-        
-        # 2. Capuchon du haut
-        i_tris.append(idx_center_top)
-        j_tris.append(idx_top[idx_i])
-        k_tris.append(idx_top[idx_j])
-        
-        # 3. Côtés (deux triangles pour former un quad)
-        i_tris.extend([idx_i, idx_top[idx_i]])
-        j_tris.extend([idx_j, idx_top[idx_j]])
-        k_tris.extend([idx_top[idx_i], idx_top[idx_j]])
-        
-        i_tris.extend([idx_i, idx_top[idx_j]])
-        j_tris.extend([idx_j, idx_j])
-        k_tris.extend([idx_top[idx_j], idx_i])
-
     return go.Mesh3d(
         x=x, y=y, z=z, 
-        i=i_tris, j=j_tris, k=k_tris,
+        i=tris[:,0], j=tris[:,1], k=tris[:,2],
         opacity=1.0, color=color, name=name,
         flatshading=True, showscale=False, hoverinfo="skip",
         legendgroup=name, showlegend=showlegend
     )
 # --- FIN NOUVELLE FONCTION ---
+
+
+class MeshBatch:
+    """
+    Regroupe les maillages par matériau (couleur, opacité) : un seul Mesh3d par matériau, quel que soit le nombre de pièces.
+    Chaque pièce ajoutée reçoit un numéro ; le propriétaire de chaque sommet et de chaque face est conservé
+    (texte de survol, sélection d'une pièce à partir d'une face).
+    """
+    def __init__(self):
+        self.labels = []  # numéro de pièce -> étiquette
+        self.groups = {}  # (couleur, opacité) -> blocs de sommets, triangles et propriétaires
+
+    def _append(self, color, opacity, verts, tris, vert_owner, face_owner):
+        g = self.groups.setdefault((color, opacity), {'verts': [], 'tris': [], 'vert_owner': [], 'face_owner': [], 'n': 0})
+        g['verts'].append(np.asarray(verts, dtype=float))
+        g['tris'].append(np.asarray(tris) + g['n'])
+        g['vert_owner'].append(vert_owner)
+        g['face_owner'].append(face_owner)
+        g['n'] += len(verts)
+
+    def add_mesh(self, verts, tris, color, opacity=1.0, label=""):
+        """Ajoute un maillage (sommets (N, 3), triangles (M, 3)) ; retourne le numéro de la pièce."""
+        owner = len(self.labels)
+        self.labels.append(label)
+        self._append(color, opacity, verts, tris, np.full(len(verts), owner), np.full(len(tris), owner))
+        return owner
+
+    def add_cuboids(self, sizes, origins, color, opacity=1.0, labels=None, angles=None, axes=None, pivots=None):
+        """Ajoute N cuboïdes d'un même matériau en un seul bloc (voir cuboid_batch) ; retourne leurs numéros de pièce."""
+        verts, tris = cuboid_batch(sizes, origins, angles, axes, pivots)
+        n = len(tris) // 12
+        first = len(self.labels)
+        self.labels.extend(labels if labels is not None else [""] * n)
+        owners = np.arange(first, first + n)
+        self._append(color, opacity, verts, tris, np.repeat(owners, 8), np.repeat(owners, 12))
+        return owners
+
+    def add_cuboid(self, L, W, H, origin=(0,0,0), color='lightblue', opacity=1.0, label="",
+                   rotation_angle=0, rotation_axis='z', rotation_pivot=None):
+        """Même géométrie que cuboid_mesh_for, ajoutée au lot du matériau."""
+        verts = make_cuboid_vertices(L, W, H, origin)
+        if rotation_angle != 0:
+            verts = rotate_vertices(verts, rotation_angle, rotation_axis, origin if rotation_pivot is None else rotation_pivot)
+        return self.add_mesh(verts, cuboid_triangles(), color, opacity, label)
+
+    def add_cylinders(self, origins, heights, radii, color, opacity=1.0, labels=None, n_points=20, axis='z'):
+        """Ajoute N cylindres d'un même matériau en un seul bloc (voir cylinder_batch) ; retourne leurs numéros de pièce."""
+        verts, tris = cylinder_batch(origins, heights, radii, n_points, axis)
+        n = len(tris) // (6 * n_points)
+        first = len(self.labels)
+        self.labels.extend(labels if labels is not None else [""] * n)
+        owners = np.arange(first, first + n)
+        self._append(color, opacity, verts, tris, np.repeat(owners, 2*n_points + 2), np.repeat(owners, 6 * n_points))
+        return owners
+
+    def extend(self, other):
+        """Ajoute toutes les pièces d'un autre lot (ex. lot mémoïsé d'un caisson), numéros de pièce décalés."""
+        offset = len(self.labels)
+        self.labels.extend(other.labels)
+        for (color, opacity), g in other.groups.items():
+            self._append(color, opacity, np.concatenate(g['verts']), np.concatenate(g['tris']),
+                         np.concatenate(g['vert_owner']) + offset, np.concatenate(g['face_owner']) + offset)
+
+    def face_owners(self, material):
+        """Numéro de pièce de chaque face du Mesh3d d'un matériau (couleur, opacité)."""
+        return np.concatenate(self.groups[material]['face_owner'])
+
+    def label_of_face(self, material, face_index):
+        return self.labels[self.face_owners(material)[face_index]]
+
+    def meshes(self):
+        """(couleur, opacité, sommets (N, 3), triangles (M, 3)) de chaque matériau, dans l'ordre de première apparition."""
+        for (color, opacity), g in self.groups.items():
+            yield color, opacity, np.concatenate(g['verts']), np.concatenate(g['tris'])
+
+    def traces(self, binary=True):
+        """
+        Un Mesh3d par matériau, dans l'ordre de première apparition ; le survol affiche l'étiquette de la pièce.
+        binary=True : sommets en float32 et indices en uint32, sérialisés par Plotly en tableaux typés base64
+        (au lieu de listes JSON de flottants) ; binary=False : listes JSON.
+        """
+        labels = np.array(self.labels, dtype=object)
+        traces = []
+        for (color, opacity, verts, tris), g in zip(self.meshes(), self.groups.values()):
+            if binary:
+                coords = np.ascontiguousarray(verts.T, dtype=np.float32)
+                index = np.ascontiguousarray(tris.T, dtype=np.uint32)
+            else:
+                coords, index = verts.T.tolist(), tris.T.tolist()
+            traces.append(go.Mesh3d(
+                x=coords[0], y=coords[1], z=coords[2], i=index[0], j=index[1], k=index[2],
+                opacity=opacity, color=color, flatshading=True, showscale=False, showlegend=False,
+                text=labels[np.concatenate(g['vert_owner'])], hovertemplate="%{text}<extra></extra>"
+            ))
+        return traces
@@ -0,0 +1,93 @@
+# Contenu de gltf_export.py
+# Export de la scène assemblée en glTF binaire (.glb), lisible par n'importe quelle visionneuse 3D.
+# Même géométrie que la prévisualisation (corps, portes pivotées, façades de tiroir, étagères, pieds), sans figure Plotly :
+# un maillage par matériau, un seul tampon binaire. Scène en Z vertical -> glTF en Y vertical, en mètres.
+
+import json
+import struct
+import numpy as np
+from scene_graph import compute_scene_origins
+from scene_preview import MATERIALS, build_scene_batch
+
+GLB_MAGIC = 0x46546C67  # 'glTF'
+GLB_VERSION = 2
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+FLOAT = 5126
+UNSIGNED_SHORT = 5123
+UNSIGNED_INT = 5125
+METERS_PER_MM = 0.001
+
+def _linear_rgb(hex_color):
+    """Couleur '#RRGGBB' ou '#RGB' (sRVB) -> composantes linéaires, comme l'attend baseColorFactor."""
+    h = hex_color.lstrip('#')
+    if len(h) == 3: h = ''.join(c * 2 for c in h)
+    srgb = np.array([int(h[k:k+2], 16) for k in (0, 2, 4)]) / 255.0
+    return np.where(srgb <= 0.04045, srgb / 12.92, ((srgb + 0.055) / 1.055) ** 2.4).tolist()
+
+def _pad(data, fill=b'\x00'):
+    return data + fill * (-len(data) % 4)
+
+def build_glb(meshes):
+    """
+    Fichier GLB à partir de [(nom, couleur, opacité, sommets (N, 3) en Y vertical, triangles (M, 3))].
+    Pas de normales : les visionneuses calculent des normales par face (rendu à facettes, comme la prévisualisation).
+    """
+    gltf = {
+        'asset': {'version': '2.0', 'generator': 'gltf_export.py'},
+        'scene': 0, 'scenes': [{'nodes': []}], 'nodes': [], 'meshes': [], 'materials': [],
+        'buffers': [], 'bufferViews': [], 'accessors': [],
+    }
+    blob = bytearray()
+
+    def add_view(data, target):
+        blob.extend(b'\x00' * (-len(blob) % 4)) # Alignement sur 4 octets
+        gltf['bufferViews'].append({'buffer': 0, 'byteOffset': len(blob), 'byteLength': len(data), 'target': target})
+        blob.extend(data)
+        return len(gltf['bufferViews']) - 1
+
+    for name, color, opacity, verts, tris in meshes:
+        positions = np.ascontiguousarray(verts, dtype=np.float32)
+        index_type, index_dtype = (UNSIGNED_SHORT, np.uint16) if len(positions) <= 0xFFFF else (UNSIGNED_INT, np.uint32)
+        indices = np.ascontiguousarray(tris, dtype=index_dtype).ravel()
+        gltf['accessors'].append({'bufferView': add_view(positions.tobytes(), ARRAY_BUFFER), 'componentType': FLOAT,
+                                  'count': len(positions), 'type': 'VEC3',
+                                  'min': positions.min(axis=0).tolist(), 'max': positions.max(axis=0).tolist()})
+        gltf['accessors'].append({'bufferView': add_view(indices.tobytes(), ELEMENT_ARRAY_BUFFER), 'componentType': index_type,
+                                  'count': len(indices), 'type': 'SCALAR'})
+        material = {'name': name, 'doubleSided': True,
+                    'pbrMetallicRoughness': {'baseColorFactor': _linear_rgb(color) + [opacity], 'metallicFactor': 0.0, 'roughnessFactor': 0.8}}
+        if opacity < 1.0: material['alphaMode'] = 'BLEND'
+        gltf['materials'].append(material)
+        gltf['meshes'].append({'name': name, 'primitives': [{'attributes': {'POSITION': len(gltf['accessors']) - 2},
+                                                             'indices': len(gltf['accessors']) - 1,
+                                                             'material': len(gltf['materials']) - 1}]})
+        gltf['nodes'].append({'name': name, 'mesh': len(gltf['meshes']) - 1})
+        gltf['scenes'][0]['nodes'].append(len(gltf['nodes']) - 1)
+
+    bin_chunk = _pad(bytes(blob))
+    if bin_chunk: gltf['buffers'].append({'byteLength': len(bin_chunk)})
+    # Le schéma glTF interdit les listes vides (scène vide)
+    if not gltf['scenes'][0]['nodes']: del gltf['scenes'][0]['nodes']
+    gltf = {k: v for k, v in gltf.items() if v != []}
+    json_chunk = _pad(json.dumps(gltf, separators=(',', ':')).encode('utf-8'), b' ')
+    length = 12 + 8 + len(json_chunk) + (8 + len(bin_chunk) if bin_chunk else 0)
+    out = bytearray(struct.pack('<III', GLB_MAGIC, GLB_VERSION, length))
+    out += struct.pack('<II', len(json_chunk), CHUNK_JSON) + json_chunk
+    if bin_chunk: out += struct.pack('<II', len(bin_chunk), CHUNK_BIN) + bin_chunk
+    return bytes(out)
+
+def z_up_to_y_up(verts):
+    """Scène (x, y, z) en Z vertical -> glTF (x, z, -y) en Y vertical : rotation, sens des faces conservé."""
+    return verts[:, [0, 2, 1]] * np.array([1.0, 1.0, -1.0])
+
+def export_scene_glb(scene_cabinets, foot_height, has_feet):
+    """Scène complète (niveau de détail maximal) au format GLB, en mètres."""
+    origins = compute_scene_origins(scene_cabinets, METERS_PER_MM)
+    batch = build_scene_batch(scene_cabinets, origins, METERS_PER_MM, foot_height, has_feet, lod='detail')
+    names = {material: name for name, material in MATERIALS.items()}
+    meshes = [(names.get((color, opacity), color), color, opacity, z_up_to_y_up(verts), tris)
+              for color, opacity, verts, tris in batch.meshes()]
+    return build_glb(meshes)
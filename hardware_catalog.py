@@ -0,0 +1,118 @@
+# Contenu de hardware_catalog.py
+# Catalogue de quincaillerie (coulisses, charnières, systèmes de tiroir) chargé depuis un fichier JSON.
+# Un catalogue par fournisseur ; les recherches par profondeur / hauteur se font par dichotomie.
+# Le catalogue d'un projet est fourni par son contenu (fichier téléversé, sauvegarde du projet), jamais par un chemin
+# sur le serveur : seul le catalogue par défaut, livré avec l'application, est lu sur disque.
+
+import hashlib
+import json
+import os
+from bisect import bisect_left
+from functools import lru_cache
+from shared_cache import LRUCache
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hardware_catalog.json')
+CATALOG_CACHE_SIZE = 32 # Catalogues construits conservés, clés = empreinte du contenu
+_catalog_cache = LRUCache(max_entries=CATALOG_CACHE_SIZE)
+
+def catalog_content_id(data):
+    """Empreinte du contenu d'un catalogue (dict JSON) : indépendante de l'ordre des clés."""
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()[:16]
+
+class IntervalTable:
+    """
+    Table d'intervalles ouverts ]min, max[ disjoints -> valeur. max = None : pas de borne haute.
+    Recherche en O(log n).
+    """
+    def __init__(self, entries):
+        entries = sorted(entries, key=lambda e: e['min'])
+        self.mins = [float(e['min']) for e in entries]
+        self.maxs = [float('inf') if e.get('max') is None else float(e['max']) for e in entries]
+        self.values = [e['x'] for e in entries]
+        for i in range(1, len(entries)):
+            if self.mins[i] < self.maxs[i - 1]:
+                raise ValueError(f"Intervalles qui se chevauchent : ]{self.mins[i-1]}, {self.maxs[i-1]}[ et ]{self.mins[i]}, {self.maxs[i]}[")
+
+    def lookup(self, value, default=None):
+        i = bisect_left(self.mins, value) - 1 # dernier intervalle dont la borne basse est < value
+        if i >= 0 and value < self.maxs[i]: return self.values[i]
+        return default
+
+class HardwareCatalog:
+    def __init__(self, data):
+        self.data = data # Contenu d'origine, enregistré avec le projet
+        self.supplier = data.get('supplier', '')
+        # Empreinte du contenu : entre dans les clés des caches (plans d'usinage, contrôles, pièces)
+        self.catalog_id = catalog_content_id(data)
+        hinges = data['hinges']
+        self.hinge_edge_offset = float(hinges['edge_offset'])
+        counts = sorted(hinges['counts'], key=lambda c: c['max_height'])
+        self.hinge_max_heights = [float(c['max_height']) for c in counts]
+        self.hinge_counts = [int(c['count']) for c in counts]
+        self.hinge_default_count = int(hinges['default_count'])
+
+        self.drawer_systems = data['drawer_systems']
+        self.default_drawer_system = data['default_drawer_system']
+        if self.default_drawer_system not in self.drawer_systems:
+            raise KeyError(f"Système de tiroir par défaut inconnu : {self.default_drawer_system}")
+        slides = data['drawer_slides']
+        self.slides_all_systems = IntervalTable(slides.get('all_systems', []))
+        self.slides_by_system = {k: IntervalTable(v) for k, v in slides.get('by_system', {}).items()}
+        self.slides_default = IntervalTable(slides.get('default', []))
+
+    @property
+    def drawer_system_names(self):
+        return list(self.drawer_systems.keys())
+
+    def drawer_system(self, system):
+        """Données d'un système de tiroir (système par défaut si inconnu)."""
+        return self.drawer_systems.get(system, self.drawer_systems[self.default_drawer_system])
+
+    def drawer_back_height(self, system):
+        return self.drawer_system(system)['back_height']
+
+    def drawer_face_y(self, system):
+        return self.drawer_system(system)['face_y']
+
+    def drawer_back_y(self, system):
+        return self.drawer_system(system)['back_y']
+
+    def drawer_slide_x_positions(self, depth, system):
+        """
+        Positions X des vis de coulisse pour une profondeur de caisson.
+        Ordre de priorité : table commune à tous les systèmes, table du système, table par défaut.
+        """
+        x = self.slides_all_systems.lookup(depth)
+        if x is None and system in self.slides_by_system: x = self.slides_by_system[system].lookup(depth)
+        if x is None: x = self.slides_default.lookup(depth, [])
+        return list(x)
+
+    def hinge_count(self, door_height):
+        i = bisect_left(self.hinge_max_heights, door_height)
+        return self.hinge_counts[i] if i < len(self.hinge_counts) else self.hinge_default_count
+
+@lru_cache(maxsize=1)
+def get_default_catalog():
+    """Catalogue livré avec l'application (lu une seule fois)."""
+    with open(DEFAULT_CATALOG_PATH, encoding='utf-8') as f:
+        return HardwareCatalog(json.load(f))
+
+def catalog_from_data(data):
+    """Catalogue d'un contenu JSON déjà décodé, partagé entre sessions par empreinte de contenu."""
+    return _catalog_cache.get_or_build(catalog_content_id(data), lambda: HardwareCatalog(data))
+
+def parse_catalog(content):
+    """
+    Catalogue d'un fichier JSON téléversé (octets).
+    ValueError si le contenu n'est pas un catalogue valide.
+    """
+    try:
+        data = json.loads(content)
+        if not isinstance(data, dict): raise TypeError("objet JSON attendu")
+        return catalog_from_data(data)
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise ValueError("Catalogue de quincaillerie invalide") from e
+
+def get_catalog(data=None):
+    """Catalogue d'un contenu enregistré (dict, ex. scene['hardware_catalog']) ; catalogue par défaut si vide."""
+    return catalog_from_data(data) if data else get_default_catalog()
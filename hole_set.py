@@ -0,0 +1,322 @@
+# Contenu de hole_set.py
+# Ensemble de perçages stocké en tableaux NumPy (x, y + codes entiers pour type / diamètre / source).
+# Remplace les listes de dicts {'type', 'x', 'y', 'diam_str', 'source', 'source_name', 'group_id'}.
+# Les crémaillères (rangées au pas de 32 mm) restent compressées en séries (start, step, count, x_front, x_back).
+
+import hashlib
+from types import MappingProxyType
+import numpy as np
+
+class _Interner:
+    """Table de correspondance valeur <-> petit entier (0 est réservé à None)."""
+    def __init__(self):
+        self.values = [None]
+        self.codes = {None: 0}
+        self._lookup = None
+
+    def code(self, value):
+        c = self.codes.get(value)
+        if c is None:
+            c = len(self.values)
+            self.values.append(value)
+            self.codes[value] = c
+            self._lookup = None
+        return c
+
+    def decode(self, codes):
+        """Décode un tableau de codes en tableau d'objets."""
+        if self._lookup is None or len(self._lookup) != len(self.values):
+            self._lookup = np.array(self.values, dtype=object)
+        return self._lookup[codes]
+
+class _NoneGroup:
+    """group_id présent mais None (ancien format) : distinct d'un group_id absent, que représente le code 0."""
+    def __repr__(self): return '<group_id None>'
+
+NONE_GROUP = _NoneGroup()
+
+TYPES = _Interner()
+DIAMS = _Interner()
+SOURCES = _Interner()
+NAMES = _Interner()
+GROUPS = _Interner()
+GROUPS.code(NONE_GROUP) # code 1
+
+RACK_STEP = 32.0
+
+_FIELDS = ('x', 'y', 'type', 'diam', 'source', 'name', 'group')
+_LABELS = ('type', 'diam', 'source', 'name', 'group')
+# 'pos' : nombre de points explicites qui précèdent la série dans l'ordre de perçage
+_RUN_FIELDS = ('pos', 'start', 'step', 'count', 'x_front', 'x_back') + _LABELS
+_CODE_DTYPE = np.int32
+
+def _codes(c, n):
+    if c is None: return np.zeros(n, dtype=_CODE_DTYPE)
+    return np.broadcast_to(np.asarray(c, dtype=_CODE_DTYPE), (n,))
+
+def _empty_runs():
+    runs = {f: np.empty(0) for f in ('start', 'step', 'x_front', 'x_back')}
+    runs['pos'] = np.empty(0, dtype=np.int64)
+    runs['count'] = np.empty(0, dtype=np.int64)
+    for f in _LABELS: runs[f] = np.empty(0, dtype=_CODE_DTYPE)
+    return runs
+
+def _group_code(h):
+    # L'ancien code distingue un group_id absent (zone 'unk') d'un group_id None (zone propre) : deux codes distincts
+    if 'group_id' not in h: return 0
+    gid = h['group_id']
+    return GROUPS.code(NONE_GROUP if gid is None else gid)
+
+def rows_to_runs(ys, step=RACK_STEP):
+    """Découpe des hauteurs triées en séries au pas 'step'. Retourne [(start, count), ...]."""
+    ys = np.asarray(ys, dtype=float)
+    if len(ys) == 0: return []
+    breaks = np.flatnonzero(np.diff(ys) != step) + 1
+    bounds = np.concatenate(([0], breaks, [len(ys)]))
+    return [(float(ys[a]), int(b - a)) for a, b in zip(bounds[:-1], bounds[1:])]
+
+class HoleSet:
+    """
+    Perçages d'une face de panneau.
+    x, y : float64 ; type, diam, source, name, group : codes (voir TYPES, DIAMS, SOURCES, NAMES, GROUPS).
+    runs : séries de crémaillère (dict de tableaux, voir _RUN_FIELDS). Chaque rangée k d'une série donne
+    deux trous (x_front puis x_back) à y = start + k * step.
+    Les attributs x, y, ... ne décrivent que les points explicites ; expanded() développe les séries.
+    Les instances sont traitées comme immuables : les opérations renvoient de nouveaux ensembles.
+    freeze() rend ce contrat effectif (tableaux en lecture seule) pour les ensembles partagés par un cache.
+    """
+    __slots__ = _FIELDS + ('runs', '_digest', '_render_digest', '_expanded')
+
+    def __init__(self, x, y, type, diam, source=None, name=None, group=None, runs=None):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        n = len(self.x)
+        self.type = _codes(type, n)
+        self.diam = _codes(diam, n)
+        self.source = _codes(source, n)
+        self.name = _codes(name, n)
+        self.group = _codes(group, n)
+        self.runs = runs if runs is not None else _empty_runs()
+        self._digest = None
+        self._render_digest = None
+        self._expanded = None
+
+    # --- Construction ---
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0), np.empty(0), None, None)
+
+    @classmethod
+    def points(cls, xs, ys, type='vis', diam_str="⌀3", source=None, source_name=None, group_id=None):
+        """Bloc de perçages identiques (même type / diamètre / source) aux positions (xs, ys)."""
+        xs, ys = np.broadcast_arrays(np.asarray(xs, dtype=float), np.asarray(ys, dtype=float))
+        return cls(xs.ravel(), ys.ravel(), TYPES.code(type), DIAMS.code(diam_str),
+                   SOURCES.code(source), NAMES.code(source_name), GROUPS.code(group_id))
+
+    @classmethod
+    def rack(cls, runs, x_front, x_back, step=RACK_STEP, type='tourillon', diam_str="⌀5/12", source=None, source_name=None, group_id=None):
+        """Crémaillère : séries [(start, count), ...] de rangées au pas 'step', percées en x_front et x_back."""
+        runs = [(s, c) for s, c in runs if c > 0]
+        m = len(runs)
+        data = {
+            'pos': np.zeros(m, dtype=np.int64),
+            'start': np.array([s for s, _ in runs], dtype=float),
+            'step': np.full(m, float(step)),
+            'count': np.array([c for _, c in runs], dtype=np.int64),
+            'x_front': np.full(m, float(x_front)),
+            'x_back': np.full(m, float(x_back)),
+        }
+        for f, value in zip(_LABELS, (TYPES.code(type), DIAMS.code(diam_str), SOURCES.code(source), NAMES.code(source_name), GROUPS.code(group_id))):
+            data[f] = np.full(m, value, dtype=_CODE_DTYPE)
+        empty = cls.empty()
+        return cls(empty.x, empty.y, None, None, runs=data)
+
+    @classmethod
+    def from_dicts(cls, holes):
+        holes = list(holes)
+        return cls(
+            [h['x'] for h in holes], [h['y'] for h in holes],
+            [TYPES.code(h.get('type')) for h in holes], [DIAMS.code(h.get('diam_str')) for h in holes],
+            [SOURCES.code(h.get('source')) for h in holes], [NAMES.code(h.get('source_name')) for h in holes],
+            [_group_code(h) for h in holes],
+        )
+
+    @classmethod
+    def concat(cls, sets):
+        sets = [as_hole_set(s) for s in sets]
+        if not sets: return cls.empty()
+        offsets = np.cumsum([0] + [s.n_points for s in sets[:-1]])
+        runs = {f: np.concatenate([s.runs[f] for s in sets]) for f in _RUN_FIELDS if f != 'pos'}
+        runs['pos'] = np.concatenate([s.runs['pos'] + off for s, off in zip(sets, offsets)]).astype(np.int64)
+        return cls(*(np.concatenate([getattr(s, f) for s in sets]) for f in _FIELDS), runs=runs)
+
+    # --- Tailles ---
+    @property
+    def n_points(self):
+        """Nombre de points explicites (hors séries)."""
+        return len(self.x)
+
+    @property
+    def n_runs(self):
+        return len(self.runs['start'])
+
+    def run_sizes(self):
+        """Nombre de trous de chaque série (2 par rangée)."""
+        return 2 * self.runs['count']
+
+    def __len__(self):
+        return self.n_points + int(self.run_sizes().sum())
+
+    def __add__(self, other):
+        return HoleSet.concat([self, other])
+
+    # --- Séries ---
+    def run_offsets(self):
+        """Indice (dans l'ordre développé) du premier trou de chaque série."""
+        sizes = self.run_sizes()
+        return self.runs['pos'] + np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.int64)
+
+    def point_offsets(self):
+        """Indice (dans l'ordre développé) de chaque point explicite."""
+        sizes = np.concatenate(([0], np.cumsum(self.run_sizes()))).astype(np.int64)
+        return np.arange(self.n_points) + sizes[np.searchsorted(self.runs['pos'], np.arange(self.n_points), side='right')]
+
+    def run_rows(self, r):
+        """Hauteurs des rangées de la série r."""
+        return self.runs['start'][r] + self.runs['step'][r] * np.arange(self.runs['count'][r])
+
+    def expanded(self, which=None):
+        """
+        Développe les séries en points explicites, sans changer l'ordre de perçage.
+        which : masque des séries à développer (toutes par défaut).
+        """
+        if which is None:
+            if self._expanded is not None: return self._expanded
+            if self.n_runs == 0: return self
+            which = np.ones(self.n_runs, dtype=bool)
+        which = np.asarray(which, dtype=bool)
+        runs = self.runs
+        idx = np.flatnonzero(which)
+        rows = [self.run_rows(r) for r in idx]
+        new = {
+            'x': [np.column_stack([np.full(len(ys), runs['x_front'][r]), np.full(len(ys), runs['x_back'][r])]).ravel() for r, ys in zip(idx, rows)],
+            'y': [np.repeat(ys, 2) for ys in rows],
+        }
+        for f in _LABELS:
+            new[f] = [np.full(2 * len(ys), runs[f][r], dtype=_CODE_DTYPE) for r, ys in zip(idx, rows)]
+        at = np.repeat(runs['pos'][idx], 2 * runs['count'][idx])
+        fields = []
+        for f in _FIELDS:
+            values = np.concatenate(new[f]) if len(idx) else np.empty(0, dtype=getattr(self, f).dtype)
+            fields.append(np.insert(np.asarray(getattr(self, f)), at, values))
+        # Les séries conservées se décalent des trous insérés avant elles
+        inserted_before = np.concatenate(([0], np.cumsum(np.where(which, self.run_sizes(), 0))[:-1])).astype(np.int64)
+        keep = ~which
+        kept = {f: runs[f][keep] for f in _RUN_FIELDS}
+        kept['pos'] = (runs['pos'] + inserted_before)[keep]
+        result = HoleSet(*fields, runs=kept)
+        if keep.sum() == 0 and which.all(): self._expanded = result
+        return result
+
+    def freeze(self):
+        """
+        Passe les tableaux (points et séries) en lecture seule et retourne l'ensemble.
+        Les tableaux partagés avec d'autres ensembles (ex. y d'un mirrored_x) deviennent eux aussi non modifiables.
+        """
+        for f in _FIELDS: getattr(self, f).flags.writeable = False
+        for a in self.runs.values(): a.flags.writeable = False
+        self.runs = MappingProxyType(self.runs)
+        return self
+
+    # --- Opérations en bloc ---
+    def filter(self, mask):
+        """Sélection (masque ou indices) dans l'ordre développé ; le résultat n'a plus de séries."""
+        full = self.expanded()
+        return HoleSet(*(getattr(full, f)[mask] for f in _FIELDS))
+
+    def mirrored_x(self, width):
+        """Symétrie gauche/droite : x -> width - x."""
+        runs = dict(self.runs, x_front=width - self.runs['x_front'], x_back=width - self.runs['x_back'])
+        return HoleSet(width - self.x, self.y, self.type, self.diam, self.source, self.name, self.group, runs=runs)
+
+    def shifted(self, dx=0.0, dy=0.0):
+        runs = dict(self.runs, start=self.runs['start'] + dy, x_front=self.runs['x_front'] + dx, x_back=self.runs['x_back'] + dx)
+        return HoleSet(self.x + dx, self.y + dy, self.type, self.diam, self.source, self.name, self.group, runs=runs)
+
+    def with_labels(self, type=None, source=None, source_name=None, group_id=None):
+        """Remplace type / source / nom / groupe pour tout l'ensemble (None : inchangé)."""
+        codes = {'type': None if type is None else TYPES.code(type),
+                 'source': None if source is None else SOURCES.code(source),
+                 'name': None if source_name is None else NAMES.code(source_name),
+                 'group': None if group_id is None else GROUPS.code(group_id)}
+        runs = dict(self.runs)
+        for f, c in codes.items():
+            if c is not None: runs[f] = np.full(self.n_runs, c, dtype=_CODE_DTYPE)
+        return HoleSet(self.x, self.y,
+                       self.type if codes['type'] is None else codes['type'], self.diam,
+                       self.source if codes['source'] is None else codes['source'],
+                       self.name if codes['name'] is None else codes['name'],
+                       self.group if codes['group'] is None else codes['group'], runs=runs)
+
+    # --- Lecture (points explicites) ---
+    def type_names(self): return TYPES.decode(self.type)
+    def diam_strs(self): return DIAMS.decode(self.diam)
+    def source_values(self): return SOURCES.decode(self.source)
+    def source_names(self): return NAMES.decode(self.name)
+    def group_ids(self): return GROUPS.decode(self.group)
+
+    def to_dicts(self):
+        """Conversion vers l'ancien format (liste de dicts, séries développées), pour les consommateurs non migrés."""
+        full = self.expanded()
+        holes = []
+        cols = zip(full.type_names(), full.x.tolist(), full.y.tolist(), full.diam_strs(),
+                   full.source_values(), full.source_names(), full.group_ids())
+        for t, x, y, d, src, name, gid in cols:
+            h = {'type': t, 'x': x, 'y': y, 'diam_str': d}
+            if src is not None: h['source'] = src
+            if name is not None: h['source_name'] = name
+            if gid is not None: h['group_id'] = None if gid is NONE_GROUP else gid
+            holes.append(h)
+        return holes
+
+    def __iter__(self):
+        return iter(self.to_dicts())
+
+    def digest(self):
+        """Empreinte du contenu (points, séries et libellés décodés), stable d'un processus à l'autre."""
+        if self._digest is None:
+            h = hashlib.sha256()
+            h.update(np.ascontiguousarray(self.x).tobytes())
+            h.update(np.ascontiguousarray(self.y).tobytes())
+            for labels in (self.type_names(), self.diam_strs(), self.source_values(), self.source_names(), self.group_ids()):
+                h.update(repr(labels.tolist()).encode())
+            for f in ('pos', 'start', 'step', 'count', 'x_front', 'x_back'):
+                h.update(np.ascontiguousarray(self.runs[f]).tobytes())
+            for f, interner in zip(_LABELS, (TYPES, DIAMS, SOURCES, NAMES, GROUPS)):
+                h.update(repr(interner.decode(self.runs[f]).tolist()).encode())
+            self._digest = h.hexdigest()
+        return self._digest
+
+    def render_digest(self):
+        """
+        Empreinte limitée à ce que dessine une feuille d'usinage : positions, types, diamètres et géométrie des séries.
+        Sources, noms et groupes n'y entrent pas : deux caissons identiques partagent leurs feuilles.
+        """
+        if self._render_digest is None:
+            h = hashlib.sha256()
+            h.update(np.ascontiguousarray(self.x).tobytes())
+            h.update(np.ascontiguousarray(self.y).tobytes())
+            for labels in (self.type_names(), self.diam_strs()):
+                h.update(repr(labels.tolist()).encode())
+            for f in ('pos', 'start', 'step', 'count', 'x_front', 'x_back'):
+                h.update(np.ascontiguousarray(self.runs[f]).tobytes())
+            for f, interner in (('type', TYPES), ('diam', DIAMS)):
+                h.update(repr(interner.decode(self.runs[f]).tolist()).encode())
+            self._render_digest = h.hexdigest()
+        return self._render_digest
+
+def as_hole_set(holes):
+    """Accepte un HoleSet, une liste de dicts ou None."""
+    if isinstance(holes, HoleSet): return holes
+    if not holes: return HoleSet.empty()
+    return HoleSet.from_dicts(holes)
@@ -1,54 +1,32 @@
 # Contenu de machining_logic.py
 import math
+import numpy as np
+from hardware_catalog import get_default_catalog
+from scene_graph import compute_scene_origins
+from hole_set import HoleSet, as_hole_set, rows_to_runs, RACK_STEP, SOURCES, NAMES, GROUPS, NONE_GROUP
 
 def calculate_origins_recursively(scene_cabinets, unit_factor):
-    calculated_origins = {}
-    def get_absolute_origin(caisson_index):
-        if caisson_index in calculated_origins: return calculated_origins[caisson_index]
-        caisson = scene_cabinets[caisson_index]
-        parent_idx = caisson['parent_index']
-        if parent_idx is None or parent_idx >= len(scene_cabinets):
-            calculated_origins[caisson_index] = (0.0, 0.0, 0.0)
-            return (0.0, 0.0, 0.0)
-        
-        parent_xyz = get_absolute_origin(parent_idx)
-        px, py, pz = parent_xyz
-        
-        parent_L = scene_cabinets[parent_idx]['dims']['L_raw'] * unit_factor
-        parent_H = scene_cabinets[parent_idx]['dims']['H_raw'] * unit_factor
-        my_L = caisson['dims']['L_raw'] * unit_factor
-        
-        if caisson['attachment_dir'] == 'right': px += parent_L
-        elif caisson['attachment_dir'] == 'left': px -= my_L
-        elif caisson['attachment_dir'] == 'up': pz += parent_H
-        
-        calculated_origins[caisson_index] = (px, py, pz)
-        return (px, py, pz)
-    
-    for i in range(len(scene_cabinets)): get_absolute_origin(i)
-    return calculated_origins
-
-def get_hinge_y_positions(door_height_raw):
-    if door_height_raw <= 1000: num = 2
-    elif door_height_raw <= 1500: num = 3
-    elif door_height_raw <= 2000: num = 4
-    elif door_height_raw <= 2400: num = 5
-    else: num = 6
-    if num == 2: return [80.0, door_height_raw - 80.0]
-    res = [80.0]
-    spacing = (door_height_raw - 160.0) / (num - 1)
-    for i in range(1, num - 1): res.append(80.0 + (i * spacing))
-    res.append(door_height_raw - 80.0)
+    # Conservé pour compatibilité : calcul itératif avec détection des cycles (voir scene_graph)
+    return compute_scene_origins(scene_cabinets, unit_factor)
+
+def get_hinge_y_positions(door_height_raw, catalog=None):
+    catalog = catalog or get_default_catalog()
+    num = catalog.hinge_count(door_height_raw)
+    edge = catalog.hinge_edge_offset
+    if num == 2: return [edge, door_height_raw - edge]
+    res = [edge]
+    spacing = (door_height_raw - 2 * edge) / (num - 1)
+    for i in range(1, num - 1): res.append(edge + (i * spacing))
+    res.append(door_height_raw - edge)
     return sorted(list(set(res)))
 
 def round_to_closest_32(y_pos):
     if y_pos < 50.0: return 50.0
     return 50.0 + round((y_pos - 50.0) / 32.0) * 32.0
 
-def get_mobile_shelf_holes(H_side_raw, t_tb_raw, shelf_props, W_raw_val):
-    holes = []
+def get_mobile_shelf_hole_rows(H_side_raw, t_tb_raw, shelf_props):
+    """Hauteurs (Y) des rangées de taquets d'une étagère mobile, triées."""
     machining_type = shelf_props.get('mobile_machining_type', 'full_height')
-    x_front, x_back = 37.0, W_raw_val - 37.0
     start_y, end_y = 50.0, H_side_raw - 50.0
     
     keep = []
@@ -68,17 +46,41 @@ def get_mobile_shelf_holes(H_side_raw, t_tb_raw, shelf_props, W_raw_val):
             for i in range(1, n + 1): keep.append(round_to_closest_32(y_closest + i*32))
             for i in range(1, m + 1): keep.append(round_to_closest_32(y_closest - i*32))
     
-    keep = sorted(list(set([y for y in keep if start_y <= y <= end_y])))
-    
+    return sorted(list(set([y for y in keep if start_y <= y <= end_y])))
+
+def get_mobile_shelf_holes(H_side_raw, t_tb_raw, shelf_props, W_raw_val):
+    holes = []
+    x_front, x_back = 37.0, W_raw_val - 37.0
     shelf_id = id(shelf_props) 
     
-    for y in keep:
+    for y in get_mobile_shelf_hole_rows(H_side_raw, t_tb_raw, shelf_props):
         holes.extend([
             {'type': 'tourillon', 'x': x_front, 'y': y, 'diam_str': "⌀5/12", 'source': 'shelf_mobile', 'group_id': shelf_id}, 
             {'type': 'tourillon', 'x': x_back, 'y': y, 'diam_str': "⌀5/12", 'source': 'shelf_mobile', 'group_id': shelf_id}
         ])
     return holes
 
+def get_mobile_shelf_rack_runs(H_side_raw, t_tb_raw, shelf_props):
+    """Rangées de taquets sous forme de séries au pas de 32 : [(start, count), ...]."""
+    if shelf_props.get('mobile_machining_type', 'full_height') != 'full_height':
+        return rows_to_runs(get_mobile_shelf_hole_rows(H_side_raw, t_tb_raw, shelf_props))
+    # Toute hauteur : une seule série de 50 à H - 50, sans développer les rangées
+    start_y, end_y = 50.0, H_side_raw - 50.0
+    count = max(int((end_y - start_y) // RACK_STEP) + 1, 0)
+    while start_y + count * RACK_STEP <= end_y: count += 1
+    while count > 0 and start_y + (count - 1) * RACK_STEP > end_y: count -= 1
+    return [(start_y, count)] if count else []
+
+def get_mobile_shelf_hole_set(H_side_raw, t_tb_raw, shelf_props, W_raw_val, group_id=None, source_name=None):
+    """
+    Version HoleSet de get_mobile_shelf_holes (mêmes trous, même ordre), en séries de crémaillère.
+    group_id : libellé stable de l'étagère (ex. "C0_S1"), utilisé par detect_collisions pour les zones de crémaillère.
+    Pas d'id() par défaut : les libellés sont internés pour toute la durée du processus.
+    """
+    return HoleSet.rack(get_mobile_shelf_rack_runs(H_side_raw, t_tb_raw, shelf_props), 37.0, W_raw_val - 37.0,
+                        type='tourillon', diam_str="⌀5/12", source='shelf_mobile',
+                        source_name=source_name, group_id=group_id)
+
 def calculate_back_panel_holes(L_back, H_back):
     holes = []
     margin = 8.0
@@ -111,74 +113,169 @@ def calculate_back_panel_holes(L_back, H_back):
             
     return holes
 
-# --- CORRECTION DE LA SIGNATURE ICI ---
+COLLISION_DIST = 10.0   # Distance minimale entre deux perçages (mm)
+ZONE_MARGIN = 5.0       # Marge de sécurité autour d'une crémaillère mobile (mm)
+_GRID_NEIGHBOURS = ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1)) # demi-voisinage : chaque paire de cellules vue une fois
+
+def close_point_pairs(xs, ys, radius=COLLISION_DIST):
+    """
+    Paires (i, j, dist), i < j, de points à moins de 'radius'.
+    Hachage spatial sur une grille de pas 'radius' : seules les cellules voisines sont comparées.
+    """
+    cells = {}
+    for i, key in enumerate(zip(np.floor(xs / radius).astype(np.int64).tolist(), np.floor(ys / radius).astype(np.int64).tolist())):
+        cells.setdefault(key, []).append(i)
+    x, y = xs.tolist(), ys.tolist()
+    pairs = []
+    for (gx, gy), members in cells.items():
+        for dx, dy in _GRID_NEIGHBOURS:
+            others = members if (dx, dy) == (0, 0) else cells.get((gx + dx, gy + dy))
+            if not others: continue
+            for a in members:
+                for b in others:
+                    if others is members and b <= a: continue
+                    d = math.sqrt((x[a] - x[b])**2 + (y[a] - y[b])**2)
+                    if d < radius: pairs.append((a, b, d) if a < b else (b, a, d))
+    return pairs
+
 def detect_collisions(holes_list, shelves_list=[], panel_name=""):
     """
     Détecte les superpositions d'usinages.
+    holes_list : HoleSet ou liste de dicts. Les crémaillères mobiles sont traitées par séries,
+    sans développer les rangées ; les conflits sont rendus dans l'ordre des trous développés.
+    Mêmes conflits, dans le même ordre, que l'algorithme d'origine (voir check_collisions.py).
+    Zones : trous mobiles sans group_id -> zone commune 'unk' ; group_id None -> zone None, dont sont exemptés
+    les trous sans group_id ou à group_id None (HoleSet garde la différence, voir hole_set.NONE_GROUP).
     Retourne une liste de dictionnaires pour l'affichage.
     """
+    holes = as_hole_set(holes_list)
     conflicts = []
+    if len(holes) == 0: return conflicts
+
+    mobile = SOURCES.code('shelf_mobile')
+    # Les séries non mobiles (cas marginal) sont développées en points
+    holes = holes.expanded(holes.runs['source'] != mobile)
+    runs = holes.runs
+    n_runs = holes.n_runs
+    p_idx, r_idx = holes.point_offsets(), holes.run_offsets()
+    ys, xs = holes.y, holes.x
+    y_vals = ys.tolist()
+    p_mobile = holes.source == mobile
+    r_ends = runs['start'] + runs['step'] * (runs['count'] - 1)
+    # Index trié des points sur Y : les recherches par bande de hauteur se font par dichotomie
+    y_order = np.argsort(ys, kind='stable')
+    y_sorted = ys[y_order]
+
+    def points_between(lo, hi):
+        return y_order[np.searchsorted(y_sorted, lo, side='left'):np.searchsorted(y_sorted, hi, side='right')]
+
+    def label(codes, interner, default):
+        value = interner.values[codes]
+        return value if value is not None else default
+
+    # 1. Identifier les zones d'étagères mobiles : points et séries pris dans l'ordre de perçage
+    # Clé de zone : code du group_id, ou de 'unk' s'il est absent.
+    # Exemption : un trou sans group_id compte comme group_id None (h.get('group_id') de l'ancien code)
+    unk, none_group = GROUPS.code('unk'), GROUPS.code(NONE_GROUP)
+    p_key, r_key = np.where(holes.group == 0, unk, holes.group), np.where(runs['group'] == 0, unk, runs['group'])
+    p_own, r_own = np.where(holes.group == 0, none_group, holes.group), np.where(runs['group'] == 0, none_group, runs['group'])
+    item_order = np.argsort(np.concatenate([p_idx, r_idx]), kind='stable')
+    item_key = np.concatenate([p_key, r_key])[item_order]
+    item_mobile = np.concatenate([p_mobile, np.ones(n_runs, dtype=bool)])[item_order]
+    item_lo = np.concatenate([ys, runs['start']])[item_order]
+    item_hi = np.concatenate([ys, r_ends])[item_order]
+    item_name = np.concatenate([holes.name, runs['name']])[item_order]
+    zones = []
+    for key in dict.fromkeys(item_key[item_mobile].tolist()):
+        same = item_key == key
+        first = int(np.argmax(same & item_mobile))
+        # 'id' : clé de dédoublonnage des conflits, le group_id en texte comme dans l'ancien code
+        gid = GROUPS.values[key]
+        zones.append({'key': key, 'id': str(None if gid is NONE_GROUP else gid), 'min': item_lo[first:][same[first:]].min(), 'max': item_hi[first:][same[first:]].max(),
+                      'name': label(item_name[first], NAMES, 'Inconnu')})
+
+    # 2. Vérifier Règle 2 : Intrusion dans la zone mobile (zone de sécurité de 5mm)
+    if zones:
+        # Index d'intervalles des zones (triées par borne basse) pour les séries
+        z_lo = np.array([z['min'] for z in zones]) - ZONE_MARGIN
+        z_hi = np.array([z['max'] for z in zones]) + ZONE_MARGIN
+        z_by_lo = np.argsort(z_lo, kind='stable')
+        z_lo_sorted = z_lo[z_by_lo]
+
+        def zones_overlapping(lo, hi):
+            cand = z_by_lo[:np.searchsorted(z_lo_sorted, hi, side='right')]
+            return np.sort(cand[z_hi[cand] >= lo])
+
+        # Candidats (indice développé, zone, y, nom du trou)
+        candidates = []
+        for z, zone in enumerate(zones):
+            inside = points_between(z_lo[z], z_hi[z])
+            for i in inside[p_own[inside] != zone['key']].tolist():
+                candidates.append((int(p_idx[i]), z, y_vals[i], holes.name[i]))
+        for r in range(n_runs):
+            for z in zones_overlapping(runs['start'][r], r_ends[r]):
+                if r_own[r] == zones[z]['key']: continue
+                rows = holes.run_rows(r)
+                for k in np.flatnonzero((rows >= z_lo[z]) & (rows <= z_hi[z])):
+                    y = float(rows[k])
+                    base = int(r_idx[r]) + 2 * int(k)
+                    candidates.append((base, int(z), y, runs['name'][r]))
+                    candidates.append((base + 1, int(z), y, runs['name'][r]))
+        candidates.sort(key=lambda c: (c[0], c[1]))
+        processed_zone_holes = set()
+        for _, z, y, name in candidates:
+            zone = zones[z]
+            conflict_id = (zone['id'], y)
+            if conflict_id not in processed_zone_holes:
+                src_trou = label(name, NAMES, 'Autre usinage')
+                conflicts.append({
+                    'msg': f"Conflit de Zone : {src_trou} (Y={y:.1f}) tombe dans la crémaillère de {zone['name']}",
+                    'overlap_dist': 32.0, # Valeur par défaut pour sortir de la zone
+                    'y': y
+                })
+                processed_zone_holes.add(conflict_id)
+
+    # 3. Vérifier Règle 1 : Proximité directe (Distance < 10mm), sauf entre deux trous de crémaillère
+    # Candidats (indice développé et contenu de chaque trou, distance)
+    def point_content(i):
+        return (xs[i], y_vals[i], holes.type[i], holes.diam[i], holes.source[i], holes.name[i], holes.group[i])
+
+    pairs = []
+    for i, j, d in close_point_pairs(xs, ys):
+        if p_mobile[i] and p_mobile[j]: continue
+        pairs.append(((int(p_idx[i]), point_content(i)), (int(p_idx[j]), point_content(j)), d))
+    # Points non mobiles contre séries : seuls les points dans la bande de hauteur de la série sont examinés
+    for r in range(n_runs):
+        start, step, count = runs['start'][r], runs['step'][r], runs['count'][r]
+        near = points_between(start - COLLISION_DIST, r_ends[r] + COLLISION_DIST)
+        near = np.sort(near[~p_mobile[near]])
+        if len(near) == 0: continue
+        span = int(np.ceil(COLLISION_DIST / step))
+        k0 = np.round((ys[near] - start) / step).astype(np.int64)
+        for d in range(-span, span + 1):
+            k = k0 + d
+            ok = (k >= 0) & (k < count)
+            for col, x_col in enumerate((runs['x_front'][r], runs['x_back'][r])):
+                for i, kk in zip(near[ok], k[ok]):
+                    y = float(start + step * kk)
+                    dd = float(np.sqrt((xs[i] - x_col)**2 + (ys[i] - y)**2))
+                    if dd < COLLISION_DIST:
+                        run_hole = (int(r_idx[r]) + 2 * int(kk) + col,
+                                    (float(x_col), y, runs['type'][r], runs['diam'][r], runs['source'][r], runs['name'][r], runs['group'][r]))
+                        point_hole = (int(p_idx[i]), point_content(i))
+                        pairs.append((point_hole, run_hole, dd) if point_hole[0] < run_hole[0] else (run_hole, point_hole, dd))
+    pairs.sort(key=lambda p: (p[0][0], p[1][0]))
     processed_pairs = set()
-    
-    # 1. Identifier les zones d'étagères mobiles
-    mobile_zones = {} 
-    
-    for h in holes_list:
-        src_name = h.get('source_name', 'Inconnu')
-        src_id = h.get('group_id', 'unk')
-        
-        if src_id not in mobile_zones and h.get('source') == 'shelf_mobile':
-            mobile_zones[src_id] = {'min': h['y'], 'max': h['y'], 'name': src_name, 'type': 'shelf_mobile'}
-        elif src_id in mobile_zones:
-            mobile_zones[src_id]['min'] = min(mobile_zones[src_id]['min'], h['y'])
-            mobile_zones[src_id]['max'] = max(mobile_zones[src_id]['max'], h['y'])
-
-    # 2. Vérifier Règle 2 : Intrusion dans la zone mobile
-    for h in holes_list:
-        h_gid = h.get('group_id')
-        
-        for gid, zone in mobile_zones.items():
-            if h_gid != gid: # Ce trou ne fait pas partie de CETTE étagère mobile
-                # Zone de sécurité de 5mm
-                if zone['min'] - 5 <= h['y'] <= zone['max'] + 5:
-                    
-                    # On crée un ID unique pour ce conflit pour éviter les doublons
-                    conflict_id = f"zone_{gid}_hole_{h['y']}"
-                    if conflict_id not in processed_pairs:
-                        src_trou = h.get('source_name', 'Autre usinage')
-                        conflicts.append({
-                            'msg': f"Conflit de Zone : {src_trou} (Y={h['y']:.1f}) tombe dans la crémaillère de {zone['name']}",
-                            'overlap_dist': 32.0, # Valeur par défaut pour sortir de la zone
-                            'y': h['y']
-                        })
-                        processed_pairs.add(conflict_id)
-    
-    # 3. Vérifier Règle 1 : Proximité directe (Distance < 10mm)
-    n = len(holes_list)
-    for i in range(n):
-        h1 = holes_list[i]
-        for j in range(i + 1, n):
-            h2 = holes_list[j]
-            
-            # On ignore si même source de type mobile (déjà géré par zone ou normal)
-            src1, src2 = h1.get('source'), h2.get('source')
-            if src1 == src2 and src1 == 'shelf_mobile': continue 
-            
-            dist = math.sqrt((h1['x'] - h2['x'])**2 + (h1['y'] - h2['y'])**2)
-            
-            if dist < 10.0:
-                # Clé unique pour éviter les doublons (A vs B et B vs A)
-                pair_key = tuple(sorted((str(h1), str(h2))))
-                if pair_key not in processed_pairs:
-                    name1 = h1.get('source_name', 'Usinage 1')
-                    name2 = h2.get('source_name', 'Usinage 2')
-                    
-                    overlap = 10.0 - dist
-                    conflicts.append({
-                        'msg': f"Chevauchement entre {name1} et {name2} à Y={h1['y']:.1f} (Dist: {dist:.1f}mm)",
-                        'overlap_dist': overlap,
-                        'y': h1['y']
-                    })
-                    processed_pairs.add(pair_key)
+    for (_, c1), (_, c2), d in pairs:
+        pair_key = tuple(sorted((c1, c2)))
+        if pair_key not in processed_pairs:
+            name1 = label(c1[5], NAMES, 'Usinage 1')
+            name2 = label(c2[5], NAMES, 'Usinage 2')
+            conflicts.append({
+                'msg': f"Chevauchement entre {name1} et {name2} à Y={c1[1]:.1f} (Dist: {d:.1f}mm)",
+                'overlap_dist': 10.0 - d,
+                'y': c1[1]
+            })
+            processed_pairs.add(pair_key)
 
     return conflicts
@@ -0,0 +1,186 @@
+# Contenu de machining_plans.py
+# Plans d'usinage d'un caisson (panneaux + perçages), calculés une seule fois par état du caisson.
+# Partagés par les feuilles à l'écran, la détection de collisions et l'export HTML.
+
+import hashlib
+import json
+from types import MappingProxyType
+import numpy as np
+from hardware_catalog import get_default_catalog
+from hole_set import HoleSet, as_hole_set
+from utils import calculate_hole_positions
+from machining_logic import calculate_back_panel_holes, get_hinge_y_positions, get_mobile_shelf_hole_set
+from parts_engine import DEFAULT_FOOT_HEIGHT, calculate_panel_dimensions, get_automatic_edge_banding
+from shared_cache import LRUCache
+
+PLAN_CACHE_SIZE = 256
+_plan_cache = LRUCache(max_entries=PLAN_CACHE_SIZE)
+HOLE_FIELDS = ('face_holes', 'tranche_longue_holes', 'tranche_cote_holes')
+
+def _chants(part_name):
+    cav, car, cg, cd = get_automatic_edge_banding(part_name)
+    return {"Chant Avant": cav, "Chant Arrière": car, "Chant Gauche": cg, "Chant Droit": cd}
+
+NO_CHANTS = {"Chant Avant": False, "Chant Arrière": False, "Chant Gauche": False, "Chant Droit": False}
+ALL_CHANTS = {"Chant Avant": True, "Chant Arrière": True, "Chant Gauche": True, "Chant Droit": True}
+
+def cabinet_state_hash(cabinet, foot_height=DEFAULT_FOOT_HEIGHT):
+    """Empreinte du contenu d'un caisson qui influe sur ses usinages."""
+    payload = {k: cabinet.get(k) for k in ('dims', 'door_props', 'drawer_props', 'shelves')}
+    payload['foot_height'] = foot_height
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+def get_door_height(cabinet, foot_height=DEFAULT_FOOT_HEIGHT):
+    """Hauteur de porte utilisée pour le plan de porte et le placement des charnières."""
+    dp = cabinet['door_props']
+    H_raw = cabinet['dims']['H_raw']
+    if dp.get('door_model') == 'floor_length': return H_raw + foot_height - dp['door_gap'] - 10.0
+    return H_raw - (2 * dp['door_gap'])
+
+def get_drawer_slide_x_positions(W_raw, tech_type, catalog=None):
+    return (catalog or get_default_catalog()).drawer_slide_x_positions(W_raw, tech_type)
+
+def _panel(role, name, L, W, T, chants, face_holes=None, tranche_longue_holes=None, tranche_cote_holes=None, cutout=None):
+    return {
+        'role': role, 'name': name, 'L': L, 'W': W, 'T': T, 'chants': chants,
+        'face_holes': as_hole_set(face_holes), 'tranche_longue_holes': as_hole_set(tranche_longue_holes),
+        'tranche_cote_holes': as_hole_set(tranche_cote_holes), 'cutout': cutout
+    }
+
+def build_cabinet_machining_plan(cabinet, cab_idx, foot_height=DEFAULT_FOOT_HEIGHT, catalog=None):
+    """
+    Calcule tous les panneaux usinés d'un caisson (quincaillerie du catalogue 'catalog', défaut sinon).
+    Retourne une liste de panneaux (dicts : role, name, L, W, T, chants, face_holes,
+    tranche_longue_holes, tranche_cote_holes, cutout), dans l'ordre d'affichage.
+    Les perçages sont des HoleSet.
+    """
+    dims = cabinet['dims']
+    L_raw, W_raw, H_raw = float(dims['L_raw']), float(dims['W_raw']), float(dims['H_raw'])
+    t_lr, t_fb, t_tb = float(dims['t_lr_raw']), float(dims['t_fb_raw']), float(dims['t_tb_raw'])
+    h_side, L_trav, W_mont = H_raw, L_raw - 2 * t_lr, W_raw
+    W_back, H_back = L_raw - 2.0, H_raw - 2.0
+    catalog = catalog or get_default_catalog()
+    panel_dims = calculate_panel_dimensions(cabinet, foot_height, catalog)
+
+    ys_vis, ys_dowel = calculate_hole_positions(W_raw)
+    y_struct = [[t_tb/2, h_side - t_tb/2]]
+    blocks_mg, blocks_md = [], []
+
+    # --- 1. STRUCTURE ---
+    structure = HoleSet.concat([
+        HoleSet.points(np.reshape(ys_vis, (-1, 1)), y_struct, 'structure_vis', "⌀3", 'structure', "Structure"),
+        HoleSet.points(np.reshape(ys_dowel, (-1, 1)), y_struct, 'structure_tourillon', "⌀8/20", 'structure', "Structure"),
+    ])
+    blocks_mg.append(structure)
+    blocks_md.append(structure)
+
+    # --- 2. ÉTAGÈRES ---
+    shelf_panels = []
+    ys_vis_sf, ys_dowel_sf = calculate_hole_positions(W_raw - 10.0)
+    for s_idx, s in enumerate(cabinet.get('shelves', [])):
+        s_type = s.get('shelf_type', 'mobile')
+        s_th = float(s.get('thickness', 19.0))
+        s_name = f"Etagère {s_idx+1}"
+        tranche = None
+        if s_type == 'fixe':
+            y_c = t_tb + s['height'] + s_th/2.0
+            vis = HoleSet.points(ys_vis_sf, y_c, 'etagere_fixe_vis', "⌀3", 'shelf_fixe', s_name)
+            dowels = HoleSet.points(ys_dowel_sf, y_c, 'etagere_fixe_tourillon', "⌀8/20", 'shelf_fixe', s_name)
+            # Le montant gauche est décalé de 10 mm (profondeur de l'étagère)
+            blocks_mg.append(HoleSet.concat([vis.shifted(dx=10.0), dowels.shifted(dx=10.0)]))
+            blocks_md.append(HoleSet.concat([vis, dowels]))
+            # Trous sur la tranche de l'étagère elle-même
+            tranche = HoleSet.concat([HoleSet.points(s_th/2, ys_vis_sf, 'vis', "⌀3"),
+                                      HoleSet.points(s_th/2, ys_dowel_sf, 'tourillon', "⌀8/20")])
+        else:
+            rack = get_mobile_shelf_hole_set(h_side, t_tb, s, W_mont, group_id=f"C{cab_idx}_S{s_idx}",
+                                             source_name=s_name).with_labels(type='etagere_taquet')
+            blocks_mg.append(rack)
+            blocks_md.append(rack)
+
+        shelf_panels.append(_panel(f"etagere_{s_idx}", f"Etagère {s_type.capitalize()} {s_idx+1} (C{cab_idx})",
+                                   panel_dims['shelf_L'][s_idx], panel_dims['shelf_W'][s_idx], s_th, _chants("Etagère"),
+                                   tranche_cote_holes=tranche))
+
+    # --- 3. COULISSES ---
+    drp = cabinet['drawer_props']
+    tech_type = drp.get('drawer_tech_type', 'K')
+    if drp['has_drawer']:
+        y_slide = t_tb + 33.0 + drp['drawer_bottom_offset']
+        slides = HoleSet.points(get_drawer_slide_x_positions(W_raw, tech_type, catalog), y_slide, 'coulisse_vis', "⌀5/12", 'coulisse', "Coulisse")
+        blocks_mg.append(slides)
+        blocks_md.append(slides.mirrored_x(W_mont))
+
+    # --- 4. CHARNIÈRES (positions calculées sur la hauteur de porte) ---
+    dp = cabinet['door_props']
+    if dp['has_door']:
+        hinge_ys = np.reshape(get_hinge_y_positions(get_door_height(cabinet, foot_height), catalog), (-1, 1))
+        hinges = HoleSet.points(37.0, hinge_ys + [16.0, -16.0], 'charniere_vis', "⌀5", 'charniere', "Charnière")
+        (blocks_mg if dp['door_opening'] == 'left' else blocks_md).append(hinges)
+
+    tholes = HoleSet.points(t_tb/2, ys_dowel, 'structure_tourillon', "⌀8/20")
+    panels = [
+        _panel('traverse_bas', "Traverse Bas (Tb)", L_trav, W_mont, t_tb, _chants("Traverse"), tranche_cote_holes=tholes),
+        _panel('traverse_haut', "Traverse Haut (Th)", L_trav, W_mont, t_tb, _chants("Traverse"), tranche_cote_holes=tholes),
+        _panel('montant_gauche', "Montant Gauche (Mg)", W_mont, h_side, t_lr, _chants("Montant"), face_holes=HoleSet.concat(blocks_mg)),
+        _panel('montant_droit', "Montant Droit (Md)", W_mont, h_side, t_lr, _chants("Montant"), face_holes=HoleSet.concat(blocks_md)),
+        _panel('fond', "Panneau Arrière (F)", W_back, H_back, t_fb, NO_CHANTS, face_holes=as_hole_set(calculate_back_panel_holes(W_back, H_back))),
+    ]
+
+    # --- 5. PORTE ---
+    if dp['has_door']:
+        dH = get_door_height(cabinet, foot_height)
+        dW = L_raw - (2 * dp['door_gap'])
+        xc = 23.5 if dp['door_opening'] == 'left' else dW - 23.5
+        xv = 33.0 if dp['door_opening'] == 'left' else dW - 33.0
+        # Par charnière : le pot (⌀35) puis ses deux vis
+        hinge_ys = np.reshape(get_hinge_y_positions(dH, catalog), (-1, 1))
+        cups = HoleSet.points(xc, hinge_ys, 'tourillon', "⌀35")
+        screws = HoleSet.points(xv, hinge_ys + [22.5, -22.5], 'vis', "⌀8")
+        k = np.arange(len(hinge_ys))
+        interleave = np.column_stack([k, len(k) + 2*k, len(k) + 2*k + 1]).ravel()
+        holes_p = HoleSet.concat([cups, screws]).filter(interleave)
+        panels.append(_panel('porte', f"Porte (C{cab_idx})", dW, dH, dp['door_thickness'], ALL_CHANTS, face_holes=holes_p))
+
+    # --- 6. TIROIR ---
+    if drp['has_drawer']:
+        dr_L = L_raw - (2 * drp['drawer_gap'])
+        dr_H = drp['drawer_face_H_raw']
+        face_ys = np.array(catalog.drawer_face_y(tech_type))
+        f_holes = HoleSet.points([[32.5, dr_L - 32.5]], face_ys[face_ys < dr_H][:, None], 'tourillon_facade', "⌀10/12")
+        cutout = None
+        if drp.get('drawer_handle_type') == 'integrated_cutout':
+            cutout = {'width': drp.get('drawer_handle_width', 150.0), 'height': drp.get('drawer_handle_height', 40.0), 'offset_top': drp.get('drawer_handle_offset_top', 10.0)}
+        panels.append(_panel('tiroir_facade', f"Façade Tiroir (C{cab_idx}) [Type {tech_type}]", dr_L, dr_H, drp.get('drawer_face_thickness', 19.0), ALL_CHANTS, face_holes=f_holes, cutout=cutout))
+
+        d_L_t = L_trav - 49.0
+        back_ys = np.reshape(catalog.drawer_back_y(tech_type), (-1, 1))
+        d_holes_t = HoleSet.points([[9.0, d_L_t - 9.0]], back_ys, 'vis_dos', "⌀2.5/3")
+        panels.append(_panel('tiroir_dos', f"Tiroir-Dos (C{cab_idx}) [Type {tech_type}]", d_L_t, panel_dims['drawer_back_H'], 16.0, NO_CHANTS, face_holes=d_holes_t))
+        panels.append(_panel('tiroir_fond', f"Tiroir-Fond (C{cab_idx})", d_L_t, W_raw - (20.0 + t_fb), 16.0, NO_CHANTS))
+
+    return panels + shelf_panels
+
+def freeze_plan(plan):
+    """Plan en lecture seule : tuple de panneaux (MappingProxyType), chants / découpe non modifiables, HoleSet gelés."""
+    frozen = []
+    for panel in plan:
+        p = dict(panel, chants=MappingProxyType(dict(panel['chants'])))
+        if p['cutout'] is not None: p['cutout'] = MappingProxyType(dict(p['cutout']))
+        for f in HOLE_FIELDS: p[f] = p[f].freeze()
+        frozen.append(MappingProxyType(p))
+    return tuple(frozen)
+
+def get_cabinet_machining_plan(cabinet, cab_idx, foot_height=DEFAULT_FOOT_HEIGHT, catalog=None):
+    """
+    Version mémoïsée de build_cabinet_machining_plan (clé : index + empreinte du caisson + catalogue).
+    Le plan est partagé entre sessions : il est rendu en lecture seule (freeze_plan).
+    """
+    catalog = catalog or get_default_catalog()
+    key = (cab_idx, cabinet_state_hash(cabinet, foot_height), catalog.catalog_id)
+    return _plan_cache.get_or_build(key, lambda: freeze_plan(build_cabinet_machining_plan(cabinet, cab_idx, foot_height, catalog)))
+
+def get_plan_panel(plan, role):
+    for panel in plan:
+        if panel['role'] == role: return panel
+    return None
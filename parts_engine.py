@@ -0,0 +1,294 @@
+# Contenu de parts_engine.py
+# Moteur de calcul des pièces (feuille de débit), indépendant de Streamlit.
+# Une "scène" est un dict au format de la sauvegarde : {'scene_cabinets': [...], 'foot_height': 80.0},
+# avec en option 'hardware_catalog' (contenu du catalogue de quincaillerie du fournisseur, défaut sinon).
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from cabinet_columns import build_cabinet_columns, compute_panel_dimensions
+from hardware_catalog import get_catalog, get_default_catalog
+
+DEFAULT_FOOT_HEIGHT = 80.0
+# Pièces de structure reconnues dans le nom des lignes de debit_data (même ordre de recherche que panel_dims)
+STRUCTURE_PIECES = ("Traverse Bas", "Traverse Haut", "Montant Gauche", "Montant Droit", "Fond")
+CUT_LIST_COLUMNS = ["Lettre", "Référence Pièce", "Matière", "Caisson", "Qté", "Longueur (mm)", "Largeur (mm)", "Epaisseur",
+                    "Chant Avant", "Chant Arrière", "Chant Gauche", "Chant Droit", "Usinage"]
+
+def get_automatic_edge_banding(part_name):
+    name = part_name.lower()
+    if "etagère" in name or "etagere" in name: return True, False, False, False
+    elif "fond" in name or "dos" in name:
+        if "façade" in name or "face" in name: return True, True, True, True
+        return False, False, False, False
+    elif "traverse" in name: return True, True, False, False
+    else: return True, True, True, True
+
+def calculate_panel_dimensions(cabinet, foot_height=DEFAULT_FOOT_HEIGHT, catalog=None):
+    """Cotes de débit d'un caisson (version scalaire de cabinet_columns.compute_panel_dimensions)."""
+    dims = cabinet['dims']
+    dp = cabinet['door_props']
+    drp = cabinet['drawer_props']
+    L_traverse = dims['L_raw'] - 2 * dims['t_lr_raw']
+
+    door_H = dims['H_raw'] - (2 * dp.get('door_gap', 2.0))
+    if dp.get('door_model') == 'floor_length': door_H += foot_height
+    door_W = dims['L_raw'] - (2 * dp.get('door_gap', 2.0)) if dp.get('door_type') == 'single' else (dims['L_raw'] - 2*dp.get('door_gap', 2.0))/2
+
+    shelves = cabinet.get('shelves', [])
+    return {
+        'L_traverse': L_traverse,
+        'H_side': dims['H_raw'],
+        'fond_vertical': dims['H_raw'] - 2.0,
+        'fond_horizontal': dims['L_raw'] - 2.0,
+        'door_H': door_H,
+        'door_W': door_W,
+        'door_qty': 1 if dp.get('door_type') == 'single' else 2,
+        'drawer_face_H': drp.get('drawer_face_H_raw', 150.0),
+        'drawer_face_W': dims['L_raw'] - (2 * drp.get('drawer_gap', 2.0)),
+        'drawer_back_H': (catalog or get_default_catalog()).drawer_back_height(drp.get('drawer_tech_type', 'K')),
+        'drawer_back_W': dims['L_raw'] - 2*dims['t_lr_raw'] - 40,
+        'shelf_L': [L_traverse if s.get('shelf_type', 'mobile') == 'fixe' else L_traverse - 2.0 for s in shelves],
+        'shelf_W': [dims['W_raw'] - 10.0 for s in shelves],
+    }
+
+def calculate_cabinet_parts(i, cabinet, foot_height=DEFAULT_FOOT_HEIGHT, lettre_code=65, catalog=None):
+    """
+    Calcule les pièces d'un caisson.
+    Retourne (pièces, cotes des étagères, prochain code lettre).
+    """
+    panel = calculate_panel_dimensions(cabinet, foot_height, catalog)
+    parts = []
+    shelf_dims = {}
+    dims = cabinet['dims']
+    debit_data = cabinet['debit_data']
+
+    t_lr, t_tb, t_fb = dims['t_lr_raw'], dims['t_tb_raw'], dims['t_fb_raw']
+    h_side = panel['H_side']
+    L_traverse = panel['L_traverse']
+    dim_fond_vertical = panel['fond_vertical']; dim_fond_horizontal = panel['fond_horizontal']
+
+    panel_dims = {
+        "Traverse Bas": (L_traverse, dims['W_raw'], t_tb),
+        "Traverse Haut": (L_traverse, dims['W_raw'], t_tb),
+        "Montant Gauche": (h_side, dims['W_raw'], t_lr),
+        "Montant Droit": (h_side, dims['W_raw'], t_lr),
+        "Fond": (dim_fond_vertical, dim_fond_horizontal, t_fb)
+    }
+
+    # 1. Structure
+    for piece in debit_data:
+        new_piece = piece.copy()
+        new_piece['Lettre'] = f"C{i}-{chr(lettre_code)}"
+        lettre_code += 1
+        ref_full = new_piece["Référence Pièce"]
+        ref_key = ref_full.split(' (')[0].strip()
+        new_piece["Référence Pièce"] = ref_full
+        new_piece["Matière"] = cabinet.get('material_body', 'Matière Corps')
+        new_piece["Caisson"] = f"C{i}"
+        new_piece["Usinage"] = "CF plan" if new_piece.get("Usinage", "") else ""
+        cav, car, cg, cd = get_automatic_edge_banding(ref_key)
+        new_piece["Chant Avant"] = cav; new_piece["Chant Arrière"] = car; new_piece["Chant Gauche"] = cg; new_piece["Chant Droit"] = cd
+
+        match_found = False
+        for key, dims_tuple in panel_dims.items():
+            if key in ref_key:
+                new_piece["Longueur (mm)"] = dims_tuple[0]; new_piece["Largeur (mm)"] = dims_tuple[1]; new_piece["Epaisseur"] = dims_tuple[2]
+                match_found = True; break
+        if not match_found and "Fond" in ref_key:
+                new_piece["Longueur (mm)"] = dim_fond_vertical; new_piece["Largeur (mm)"] = dim_fond_horizontal; new_piece["Epaisseur"] = t_fb
+        parts.append(new_piece)
+
+    # 2. Porte
+    if cabinet['door_props']['has_door']:
+        dp = cabinet['door_props']
+        cav, car, cg, cd = get_automatic_edge_banding("Porte")
+        parts.append({"Lettre": f"C{i}-P", "Référence Pièce": f"Porte (C{i})", "Matière": dp.get('material', 'Matière Porte'), "Caisson": f"C{i}", "Qté": panel['door_qty'], "Longueur (mm)": panel['door_H'], "Largeur (mm)": panel['door_W'], "Epaisseur": dp.get('door_thickness', 19.0), "Chant Avant": cav, "Chant Arrière": car, "Chant Gauche": cg, "Chant Droit": cd, "Usinage": "CF plan"})
+
+    # 3. Tiroir
+    if cabinet['drawer_props']['has_drawer']:
+        drp = cabinet['drawer_props']
+
+        cav, car, cg, cd = get_automatic_edge_banding("Façade")
+        parts.append({"Lettre": f"C{i}-TF", "Référence Pièce": f"Façade Tiroir (C{i})", "Matière": drp.get('material', 'Matière Tiroir'), "Caisson": f"C{i}", "Qté": 1, "Longueur (mm)": panel['drawer_face_H'], "Largeur (mm)": panel['drawer_face_W'], "Epaisseur": drp.get('drawer_face_thickness', 19.0), "Chant Avant": cav, "Chant Arrière": car, "Chant Gauche": cg, "Chant Droit": cd, "Usinage": "CF plan"})
+
+        cav, car, cg, cd = get_automatic_edge_banding("Tiroir Dos")
+        parts.append({"Lettre": f"C{i}-TD", "Référence Pièce": f"Tiroir Dos (C{i})", "Matière": cabinet.get('material_body', 'Matière Corps'), "Caisson": f"C{i}", "Qté": 1, "Longueur (mm)": panel['drawer_back_H'], "Largeur (mm)": panel['drawer_back_W'], "Epaisseur": 16.0, "Chant Avant": cav, "Chant Arrière": car, "Chant Gauche": cg, "Chant Droit": cd, "Usinage": ""})
+
+    # 4. Étagères
+    if 'shelves' in cabinet:
+        for s_idx, s in enumerate(cabinet['shelves']):
+            s_type = s.get('shelf_type', 'mobile')
+            s_th = float(s.get('thickness', 19.0))
+            dim_L, dim_W = panel['shelf_L'][s_idx], panel['shelf_W'][s_idx]
+
+            shelf_dims[f"C{i}_S{s_idx}"] = (dim_L, dim_W)
+
+            cav, car, cg, cd = get_automatic_edge_banding("Etagère")
+            usinage_txt = "" if s_type == 'mobile' else "CF plan"
+
+            parts.append({
+                "Lettre": f"C{i}-E{s_idx+1}",
+                "Référence Pièce": f"Etagère {s_type.capitalize()} (C{i})",
+                "Matière": s.get('material', 'Matière Étagère'),
+                "Caisson": f"C{i}",
+                "Qté": 1,
+                "Longueur (mm)": dim_L,
+                "Largeur (mm)": dim_W,
+                "Epaisseur": s_th,
+                "Chant Avant": cav, "Chant Arrière": car, "Chant Gauche": cg, "Chant Droit": cd,
+                "Usinage": usinage_txt
+            })
+
+    return parts, shelf_dims, lettre_code
+
+def calculate_scene_parts(scene):
+    """
+    Calcule toutes les pièces d'une scène.
+    Retourne (liste des pièces, cotes des étagères par clé "C{i}_S{j}").
+    """
+    all_parts = []
+    shelf_dims_cache = {}
+    lettre_code = 65
+    foot_height = scene.get('foot_height', DEFAULT_FOOT_HEIGHT)
+    catalog = get_catalog(scene.get('hardware_catalog'))
+
+    for i, cabinet in enumerate(scene.get('scene_cabinets', [])):
+        parts, shelf_dims, lettre_code = calculate_cabinet_parts(i, cabinet, foot_height, lettre_code, catalog)
+        all_parts.extend(parts)
+        shelf_dims_cache.update(shelf_dims)
+
+    return all_parts, shelf_dims_cache
+
+def _cut_list_block(rank, cab, **columns):
+    # Lignes d'une catégorie de pièces ; rank : place de la catégorie dans un caisson (structure, porte, tiroir, étagères)
+    block = pd.DataFrame(columns)
+    return block, np.full(len(cab), rank), cab
+
+def _banding(part_name, n):
+    return dict(zip(CUT_LIST_COLUMNS[8:12], (np.full(n, flag) for flag in get_automatic_edge_banding(part_name))))
+
+def build_cut_list(columns, panel):
+    """
+    Feuille de débit tirée des colonnes de la scène (cabinet_columns) et de leurs cotes (compute_panel_dimensions) :
+    (DataFrame, cotes des étagères par clé "C{i}_S{j}").
+    Mêmes lignes, dans le même ordre, que pd.DataFrame(calculate_scene_parts(...)[0]).
+    """
+    cab_names = np.array([f"C{i}" for i in range(columns['count'])], dtype=object)
+    blocks = []
+
+    # 1. Structure : cotes choisies par type de pièce (une recherche par nom distinct, pas par ligne)
+    pieces = columns['pieces'].copy()
+    p_cab = columns['piece_cabinet']
+    if len(pieces):
+        key_codes, unique_refs = pd.factorize(pieces["Référence Pièce"])
+        unique_keys = [ref.split(' (')[0].strip() for ref in unique_refs]
+        roles = np.array([next((r for r, name in enumerate(STRUCTURE_PIECES) if name in k), -1) for k in unique_keys], dtype=np.int64)[key_codes]
+        banding = np.array([get_automatic_edge_banding(k) for k in unique_keys], dtype=bool).reshape(-1, 4)[key_codes]
+        matched, r = roles >= 0, np.maximum(roles, 0)
+        L_traverse, H_side = panel['L_traverse'], panel['H_side']
+        sizes = {
+            "Longueur (mm)": np.stack([L_traverse, L_traverse, H_side, H_side, panel['fond_vertical']]),
+            "Largeur (mm)": np.stack([columns['W']] * 4 + [panel['fond_horizontal']]),
+            "Epaisseur": np.stack([columns['t_tb'], columns['t_tb'], columns['t_lr'], columns['t_lr'], columns['t_fb']]),
+        }
+        for col, table in sizes.items():
+            pieces[col] = np.where(matched, table[r, p_cab], pieces[col] if col in pieces else np.nan)
+        letters = np.array([chr(c) for c in range(65, 65 + len(pieces))], dtype=object)
+        pieces["Lettre"] = cab_names[p_cab] + "-" + letters
+        pieces["Matière"] = columns['material_body'][p_cab]
+        pieces["Caisson"] = cab_names[p_cab]
+        usinage = pieces["Usinage"].fillna("").astype(bool) if "Usinage" in pieces else np.zeros(len(pieces), dtype=bool)
+        pieces["Usinage"] = np.where(usinage, "CF plan", "")
+        for k, col in enumerate(CUT_LIST_COLUMNS[8:12]): pieces[col] = banding[:, k]
+        blocks.append((pieces, np.zeros(len(pieces), dtype=np.int64), p_cab))
+
+    # 2. Porte
+    d = np.flatnonzero(columns['has_door'])
+    blocks.append(_cut_list_block(1, d, **{
+        "Lettre": cab_names[d] + "-P", "Référence Pièce": "Porte (" + cab_names[d] + ")", "Matière": columns['door_material'][d],
+        "Caisson": cab_names[d], "Qté": panel['door_qty'][d], "Longueur (mm)": panel['door_H'][d], "Largeur (mm)": panel['door_W'][d],
+        "Epaisseur": columns['door_thickness'][d], **_banding("Porte", len(d)), "Usinage": np.full(len(d), "CF plan", dtype=object)}))
+
+    # 3. Tiroir : façade puis dos
+    t = np.flatnonzero(columns['has_drawer'])
+    blocks.append(_cut_list_block(2, t, **{
+        "Lettre": cab_names[t] + "-TF", "Référence Pièce": "Façade Tiroir (" + cab_names[t] + ")", "Matière": columns['drawer_material'][t],
+        "Caisson": cab_names[t], "Qté": np.ones(len(t), dtype=np.int64), "Longueur (mm)": panel['drawer_face_H'][t],
+        "Largeur (mm)": panel['drawer_face_W'][t], "Epaisseur": columns['drawer_face_thickness'][t], **_banding("Façade", len(t)),
+        "Usinage": np.full(len(t), "CF plan", dtype=object)}))
+    blocks.append(_cut_list_block(3, t, **{
+        "Lettre": cab_names[t] + "-TD", "Référence Pièce": "Tiroir Dos (" + cab_names[t] + ")", "Matière": columns['material_body'][t],
+        "Caisson": cab_names[t], "Qté": np.ones(len(t), dtype=np.int64), "Longueur (mm)": panel['drawer_back_H'][t],
+        "Largeur (mm)": panel['drawer_back_W'][t], "Epaisseur": np.full(len(t), 16.0), **_banding("Tiroir Dos", len(t)),
+        "Usinage": np.full(len(t), "", dtype=object)}))
+
+    # 4. Étagères
+    s_cab, s_idx, s_type = columns['shelf_cabinet'], columns['shelf_index'], columns['shelf_type']
+    s_num = s_idx.astype(str).astype(object)
+    blocks.append(_cut_list_block(4, s_cab, **{
+        "Lettre": cab_names[s_cab] + "-E" + (s_idx + 1).astype(str).astype(object),
+        "Référence Pièce": "Etagère " + np.array([t.capitalize() for t in s_type], dtype=object) + " (" + cab_names[s_cab] + ")",
+        "Matière": columns['shelf_material'], "Caisson": cab_names[s_cab], "Qté": np.ones(len(s_cab), dtype=np.int64),
+        "Longueur (mm)": panel['shelf_L'], "Largeur (mm)": panel['shelf_W'], "Epaisseur": columns['shelf_thickness'],
+        **_banding("Etagère", len(s_cab)), "Usinage": np.where(s_type == 'mobile', "", "CF plan").astype(object)}))
+    shelf_keys = cab_names[s_cab] + "_S" + s_num
+    shelf_dims = dict(zip(shelf_keys.tolist(), zip(panel['shelf_L'].tolist(), panel['shelf_W'].tolist())))
+
+    # Assemblage : ordre caisson par caisson (tri stable sur (caisson, catégorie))
+    blocks = [b for b in blocks if len(b[0])]
+    if not blocks: return pd.DataFrame(columns=CUT_LIST_COLUMNS), shelf_dims
+    cut_list = pd.concat([b[0] for b in blocks], ignore_index=True)
+    order = np.lexsort((np.concatenate([b[1] for b in blocks]), np.concatenate([b[2] for b in blocks])))
+    extra = [c for c in cut_list.columns if c not in CUT_LIST_COLUMNS]
+    return cut_list.iloc[order].reset_index(drop=True)[CUT_LIST_COLUMNS + extra], shelf_dims
+
+def calculate_scene_parts_columnar(scene):
+    """
+    Même résultat que calculate_scene_parts, la feuille de débit sous forme de DataFrame :
+    toutes les cotes de la scène sont calculées en une passe sur ses colonnes (cabinet_columns),
+    puis les lignes sont assemblées directement à partir des tableaux. Adapté aux gros projets (milliers de caissons).
+    """
+    columns = build_cabinet_columns(scene.get('scene_cabinets', []), get_catalog(scene.get('hardware_catalog')))
+    return build_cut_list(columns, compute_panel_dimensions(columns, scene.get('foot_height', DEFAULT_FOOT_HEIGHT)))
+
+def calculate_scene_parts_incremental(scene, cache):
+    """
+    Variante de calculate_scene_parts qui réutilise les pièces déjà calculées.
+    cache : dict {index caisson: entrée}, à vider par l'appelant (mark_cabinet_dirty) quand un caisson change.
+    Une entrée est aussi recalculée si le caisson, son code lettre de départ, la hauteur des pieds ou le catalogue diffèrent.
+    """
+    all_parts = []
+    shelf_dims_cache = {}
+    lettre_code = 65
+    foot_height = scene.get('foot_height', DEFAULT_FOOT_HEIGHT)
+    scene_cabinets = scene.get('scene_cabinets', [])
+    catalog = get_catalog(scene.get('hardware_catalog'))
+
+    for i, cabinet in enumerate(scene_cabinets):
+        key = (id(cabinet), lettre_code, foot_height, catalog.catalog_id)
+        entry = cache.get(i)
+        if entry is None or entry['key'] != key:
+            parts, shelf_dims, next_code = calculate_cabinet_parts(i, cabinet, foot_height, lettre_code, catalog)
+            entry = {'key': key, 'parts': parts, 'shelf_dims': shelf_dims, 'next_code': next_code}
+            cache[i] = entry
+        all_parts.extend(entry['parts'])
+        shelf_dims_cache.update(entry['shelf_dims'])
+        lettre_code = entry['next_code']
+
+    for stale in [k for k in cache if k >= len(scene_cabinets)]: del cache[stale]
+    return all_parts, shelf_dims_cache
+
+def calculate_scenes_parts_batch(scenes, max_workers=None):
+    """
+    Calcule les pièces de plusieurs scènes (ex. un lot de devis).
+    max_workers=1 : calcul séquentiel dans le processus courant, sinon répartition sur des processus.
+    """
+    scenes = list(scenes)
+    if max_workers == 1 or len(scenes) <= 1:
+        return [calculate_scene_parts(scene) for scene in scenes]
+    workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, len(scenes) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(calculate_scene_parts, scenes, chunksize=chunksize))
@@ -0,0 +1,53 @@
+# Contenu de preview_component.py
+# Affichage de la prévisualisation 3D par un composant Streamlit qui garde les traces côté navigateur.
+# À chaque exécution, seuls les blocs de preview_trace_blocks dont la version a changé sont sérialisés et envoyés ;
+# le navigateur les remplace dans sa copie et redessine par Plotly.react.
+# Si sa copie ne correspond pas à la version de base de l'envoi, il demande un renvoi complet.
+
+import json
+import os
+import uuid
+import plotly.graph_objects as go
+import streamlit as st
+import streamlit.components.v1 as components
+from render_cache import PLOTLY_JS_URL
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'preview_frontend')
+_component = components.declare_component("scene_preview", path=FRONTEND_DIR)
+
+def _traces_json(traces):
+    # Passage par la figure : tableaux NumPy encodés en tableaux typés base64, comme st.plotly_chart
+    return json.loads(go.Figure(data=traces).to_json())['data']
+
+def _sync_state(key):
+    state_key = f"{key}_sync"
+    if state_key not in st.session_state:
+        st.session_state[state_key] = {'session': uuid.uuid4().hex, 'version': 0, 'sent': {}, 'order': [], 'resync': None}
+    return st.session_state[state_key]
+
+def preview_update(sync, blocks, resync_nonce=None):
+    """
+    Envoi à faire pour afficher 'blocks' ([(clé, version, construction)]) et nouvel état de synchronisation.
+    Envoi complet (base None) au premier affichage ou sur demande du navigateur (nouveau resync_nonce) ;
+    sinon seuls les blocs nouveaux ou de version différente sont construits.
+    """
+    full = not sync['sent'] or (resync_nonce is not None and resync_nonce != sync['resync'])
+    sent = {} if full else sync['sent']
+    order = [k for k, _, _ in blocks]
+    changed = [(k, v, build) for k, v, build in blocks if sent.get(k) != v]
+    if not full and not changed and order == sync['order']:
+        # Rien de neuf : le navigateur reconnaît la version qu'il affiche déjà
+        return dict(sync), {'session': sync['session'], 'version': sync['version'], 'base': sync['version'], 'order': order, 'traces': {}}
+    version = sync['version'] + 1
+    traces = {k: _traces_json(build()) for k, _, build in changed}
+    new_sync = {'session': sync['session'], 'version': version, 'sent': {k: v for k, v, _ in blocks}, 'order': order,
+                'resync': resync_nonce if resync_nonce is not None else sync['resync']}
+    return new_sync, {'session': sync['session'], 'version': version, 'base': None if full else sync['version'], 'order': order, 'traces': traces}
+
+def scene_preview_chart(blocks, layout, height=600, key='scene_preview'):
+    """Affiche la prévisualisation 3D ; seuls les blocs modifiés depuis l'exécution précédente partent au navigateur."""
+    sync = _sync_state(key)
+    value = st.session_state.get(key) or {}
+    new_sync, update = preview_update(sync, blocks, value.get('resync_nonce'))
+    st.session_state[f"{key}_sync"] = new_sync
+    _component(**update, layout=layout, height=height, plotly_url=PLOTLY_JS_URL, key=key, default=None)
@@ -0,0 +1,78 @@
+// Contenu de preview_frontend/preview.js
+// Composant Streamlit de la prévisualisation 3D (voir preview_component.py).
+// Les traces sont conservées par bloc ; chaque rendu n'apporte que les blocs modifiés depuis la version 'base',
+// puis la figure est mise à jour par Plotly.react (caméra conservée par uirevision).
+
+// Applique un envoi du serveur au magasin de traces. Retourne 'draw', 'noop' ou 'resync'.
+function applyPreviewUpdate(store, args) {
+  if (args.base === null) {
+    // Envoi complet : on repart de zéro
+    store.session = args.session;
+    store.traces = {};
+  } else if (store.session === args.session && store.version === args.version) {
+    // Version déjà affichée (rendu répété sans changement)
+    return 'noop';
+  } else if (store.session !== args.session || store.version !== args.base) {
+    // Magasin désynchronisé (iframe rechargée, envoi perdu)
+    return 'resync';
+  }
+  Object.assign(store.traces, args.traces);
+  for (const key of Object.keys(store.traces)) {
+    if (!args.order.includes(key)) delete store.traces[key];
+  }
+  store.order = args.order;
+  store.version = args.version;
+  return 'draw';
+}
+
+function previewTraces(store) {
+  return store.order.flatMap((key) => store.traces[key] || []);
+}
+
+if (typeof module !== 'undefined') module.exports = { applyPreviewUpdate, previewTraces };
+
+if (typeof window !== 'undefined') {
+  const store = { session: null, version: null, traces: {}, order: [] };
+  let layout = null;
+  let plotlyState = 'absent'; // 'absent', 'loading', 'ready'
+  let frameHeight = null;
+
+  const send = (type, data) => {
+    window.parent.postMessage({ isStreamlitMessage: true, apiVersion: 1, type, ...data }, '*');
+  };
+
+  const draw = () => {
+    if (plotlyState !== 'ready' || layout === null) return;
+    window.Plotly.react('chart', previewTraces(store), layout, { responsive: true, displaylogo: false });
+  };
+
+  const loadPlotly = (url) => {
+    if (plotlyState !== 'absent') return;
+    plotlyState = 'loading';
+    const script = document.createElement('script');
+    script.src = url;
+    script.onload = () => { plotlyState = 'ready'; draw(); };
+    document.head.appendChild(script);
+  };
+
+  window.addEventListener('message', (event) => {
+    if (event.data.type !== 'streamlit:render') return;
+    const args = event.data.args;
+    if (frameHeight !== args.height) {
+      frameHeight = args.height;
+      document.getElementById('chart').style.height = `${args.height}px`;
+      send('streamlit:setFrameHeight', { height: args.height });
+    }
+    const action = applyPreviewUpdate(store, args);
+    if (action === 'resync') {
+      // Le serveur renverra toute la scène au prochain rendu
+      send('streamlit:setComponentValue', { value: { resync_nonce: Date.now() }, dataType: 'json' });
+      return;
+    }
+    layout = args.layout;
+    loadPlotly(args.plotly_url);
+    if (action === 'draw') draw();
+  });
+
+  send('streamlit:componentReady', {});
+}
@@ -0,0 +1,57 @@
+# Contenu de render_cache.py
+# Cache des feuilles d'usinage rendues, adressé par contenu : deux panneaux identiques (même nom, mêmes cotes,
+# chants, perçages, découpe et cartouche) partagent la même figure et le même fragment HTML.
+# Partagé par l'affichage à l'écran (2.py) et l'export du dossier de plans (export_manager.py).
+
+import datetime
+import hashlib
+import json
+import uuid
+from plotly.offline import get_plotlyjs_version
+from drawing_interface import draw_machining_view_pro_final
+from machining_plans import HOLE_FIELDS
+from shared_cache import LRUCache
+
+# Plafond de chaque cache en octets : JSON de la figure (estimé à la mise en cache) et fragment HTML.
+# Une feuille de montant de 2400 mm pèse de l'ordre de 200 Ko.
+RENDER_CACHE_BYTES = 64 * 2**20
+# plotly.js de la version de plotly.py : les tableaux NumPy des figures sont sérialisés en tableaux typés
+# base64 ('bdata'), que plotly-latest (figé en 1.x) ne sait pas décoder
+PLOTLY_JS_URL = f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"
+_figure_cache = LRUCache(max_bytes=RENDER_CACHE_BYTES, weigh=lambda fig: len(fig.to_json()))
+_html_cache = LRUCache(max_bytes=RENDER_CACHE_BYTES, weigh=len)
+
+def project_header(project_name):
+    """Cartouche commun à l'écran et à l'export : nom du projet, quantité, date du jour."""
+    return {"project_name": project_name, "quantity": 1, "date": datetime.date.today().strftime("%d/%m/%Y")}
+
+def sheet_key(panel, unit_str, project_info):
+    """Empreinte canonique de tout ce qui entre dans le rendu d'une feuille (les perçages via HoleSet.render_digest)."""
+    payload = {k: panel[k] for k in ('name', 'L', 'W', 'T')}
+    payload['chants'] = dict(panel['chants'])
+    payload['cutout'] = None if panel['cutout'] is None else dict(panel['cutout'])
+    payload['unit'] = unit_str
+    payload['project'] = project_info
+    h = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode())
+    for f in HOLE_FIELDS: h.update(panel[f].render_digest().encode())
+    return h.hexdigest()
+
+def _draw(panel, unit_str, project_info):
+    return draw_machining_view_pro_final(panel['name'], panel['L'], panel['W'], panel['T'], unit_str, project_info, panel['chants'],
+                                         panel['face_holes'], panel['tranche_longue_holes'], panel['tranche_cote_holes'], panel['cutout'])
+
+def get_sheet_figure(panel, unit_str, project_info):
+    """Figure Plotly de la feuille d'usinage, mémoïsée (objet partagé, à ne pas modifier)."""
+    key = sheet_key(panel, unit_str, project_info)
+    return _figure_cache.get_or_build(key, lambda: _draw(panel, unit_str, project_info))
+
+def get_sheet_html(panel, unit_str, project_info):
+    """
+    Fragment HTML statique de la feuille (sans plotly.js), mémoïsé.
+    Le fragment en cache porte un identifiant de div fixe, remplacé à chaque appel : une même feuille peut figurer
+    plusieurs fois dans un dossier.
+    """
+    key = sheet_key(panel, unit_str, project_info)
+    div_id = f"sheet-{key}"
+    build = lambda: get_sheet_figure(panel, unit_str, project_info).to_html(include_plotlyjs=False, full_html=False, div_id=div_id, config={'staticPlot': True})
+    return _html_cache.get_or_build(key, build).replace(div_id, str(uuid.uuid4()))
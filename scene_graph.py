@@ -0,0 +1,158 @@
+# Contenu de scene_graph.py
+# Graphe de la scène (caisson parent -> caissons attachés) et calcul des origines absolues.
+# Évaluation itérative (pas de récursion), détection des cycles, mise à jour limitée aux sous-arbres modifiés.
+# Édition de la structure (suppression de branche, rattachement) en temps linéaire dans la branche.
+
+from collections import deque
+
+ORIGIN = (0.0, 0.0, 0.0)
+
+def get_parent(scene_cabinets, idx):
+    """Index du parent, ou None si le caisson est une racine (parent absent ou hors scène)."""
+    parent_idx = scene_cabinets[idx].get('parent_index')
+    if parent_idx is None or not 0 <= parent_idx < len(scene_cabinets): return None
+    return parent_idx
+
+def build_children_index(scene_cabinets):
+    """Retourne (children, roots) : liste des enfants de chaque caisson et liste des racines."""
+    children = [[] for _ in scene_cabinets]
+    roots = []
+    for i in range(len(scene_cabinets)):
+        parent_idx = get_parent(scene_cabinets, i)
+        if parent_idx is None: roots.append(i)
+        else: children[parent_idx].append(i)
+    return children, roots
+
+def child_origin(scene_cabinets, idx, parent_origin, unit_factor):
+    """Origine d'un caisson à partir de celle de son parent et de son sens d'attache."""
+    caisson = scene_cabinets[idx]
+    parent = scene_cabinets[caisson['parent_index']]
+    px, py, pz = parent_origin
+    if caisson['attachment_dir'] == 'right': px += parent['dims']['L_raw'] * unit_factor
+    elif caisson['attachment_dir'] == 'left': px -= caisson['dims']['L_raw'] * unit_factor
+    elif caisson['attachment_dir'] == 'up': pz += parent['dims']['H_raw'] * unit_factor
+    return (px, py, pz)
+
+def _propagate(scene_cabinets, children, origins, starts, unit_factor):
+    """Parcours en largeur depuis 'starts' (origines déjà connues) : calcule les origines des descendants."""
+    queue = deque(starts)
+    visited = set(starts)
+    while queue:
+        curr = queue.popleft()
+        for child in children[curr]:
+            if child in visited: continue
+            visited.add(child)
+            origins[child] = child_origin(scene_cabinets, child, origins[curr], unit_factor)
+            queue.append(child)
+    return visited
+
+def find_cycle_nodes(scene_cabinets, reached):
+    """Caissons appartenant à un cycle de parent_index, parmi ceux non atteints depuis une racine."""
+    cycle_nodes = set()
+    done = set(reached)
+    for start in range(len(scene_cabinets)):
+        if start in done: continue
+        path, pos = [], {}
+        node = start
+        while node is not None and node not in done and node not in pos:
+            pos[node] = len(path)
+            path.append(node)
+            node = get_parent(scene_cabinets, node)
+        if node in pos: cycle_nodes.update(path[pos[node]:])
+        done.update(path)
+    return cycle_nodes
+
+def _solve_origins(scene_cabinets, unit_factor, children, roots):
+    """Retourne (origines {index: (x, y, z)}, caissons pris dans un cycle)."""
+    origins = {i: ORIGIN for i in roots}
+    reached = _propagate(scene_cabinets, children, origins, roots, unit_factor)
+    cycle_nodes = []
+    if len(reached) < len(scene_cabinets):
+        cycle_nodes = sorted(find_cycle_nodes(scene_cabinets, reached))
+        for i in cycle_nodes: origins[i] = ORIGIN
+        _propagate(scene_cabinets, children, origins, cycle_nodes, unit_factor)
+    return {i: origins[i] for i in range(len(scene_cabinets))}, cycle_nodes
+
+def compute_scene_origins(scene_cabinets, unit_factor):
+    """
+    Origines absolues de tous les caissons : {index: (x, y, z)}.
+    Les caissons pris dans un cycle de parent_index sont placés à l'origine (leurs autres descendants, relativement à eux).
+    """
+    children, roots = build_children_index(scene_cabinets)
+    return _solve_origins(scene_cabinets, unit_factor, children, roots)[0]
+
+def update_subtree_origins(scene_cabinets, children, origins, idx, unit_factor):
+    """Recalcule l'origine de idx et de tout son sous-arbre (ex. après changement de L ou H). Scène sans cycle."""
+    parent_idx = get_parent(scene_cabinets, idx)
+    origins[idx] = ORIGIN if parent_idx is None else child_origin(scene_cabinets, idx, origins[parent_idx], unit_factor)
+    _propagate(scene_cabinets, children, origins, [idx], unit_factor)
+
+def get_scene_origins(scene_cabinets, unit_factor, cache, dirty=None):
+    """
+    Origines absolues, mises à jour de façon incrémentale.
+    cache : dict conservé entre deux exécutions (ex. dans st.session_state).
+    dirty : index des caissons modifiés depuis l'appel précédent (None : tout recalculer).
+    Si la structure de la scène (parents, sens d'attache) ou l'unité a changé, ou si la scène contient un cycle,
+    tout est recalculé.
+    """
+    structure = [(c.get('parent_index'), c.get('attachment_dir')) for c in scene_cabinets]
+    if dirty is None or cache.get('has_cycle', True) or cache.get('unit_factor') != unit_factor or cache.get('structure') != structure:
+        children, roots = build_children_index(scene_cabinets)
+        origins, cycle_nodes = _solve_origins(scene_cabinets, unit_factor, children, roots)
+        cache.update(unit_factor=unit_factor, structure=structure, children=children, origins=origins, has_cycle=bool(cycle_nodes))
+        return origins
+    for idx in sorted(dirty):
+        if 0 <= idx < len(scene_cabinets):
+            update_subtree_origins(scene_cabinets, cache['children'], cache['origins'], idx, unit_factor)
+    return cache['origins']
+
+def get_subtree(children, root):
+    """Index de root et de tous ses descendants (parcours en profondeur, ordre de découverte)."""
+    nodes, stack = [root], [root]
+    seen = {root}
+    while stack:
+        for child in children[stack.pop()]:
+            if child not in seen:
+                seen.add(child)
+                nodes.append(child)
+                stack.append(child)
+    return nodes
+
+def delete_subtree(scene_cabinets, children, root):
+    """
+    Supprime root et sa branche.
+    Retourne (nouvelle scène, nouvel index des enfants, correspondance ancien index -> nouvel index).
+    Les parent_index des caissons conservés sont renumérotés en une passe.
+    """
+    removed = set(get_subtree(children, root))
+    old_to_new = {}
+    new_scene = []
+    for i, c in enumerate(scene_cabinets):
+        if i not in removed:
+            old_to_new[i] = len(new_scene)
+            new_scene.append(c)
+    new_children = [[] for _ in new_scene]
+    for old_i, new_i in old_to_new.items():
+        c = scene_cabinets[old_i]
+        if c['parent_index'] is not None: c['parent_index'] = old_to_new.get(c['parent_index'], None)
+        new_children[new_i] = [old_to_new[child] for child in children[old_i] if child in old_to_new]
+    return new_scene, new_children, old_to_new
+
+ATTACHMENT_LABELS = {'right': 'D', 'left': 'G', 'up': 'H'}
+
+def reparent(scene_cabinets, children, idx, new_parent, attachment_dir):
+    """
+    Déplace la branche de idx : le caisson est attaché à new_parent dans le sens attachment_dir,
+    ses descendants suivent. Lève ValueError si new_parent fait partie de la branche (cycle).
+    """
+    if new_parent is not None and new_parent in set(get_subtree(children, idx)):
+        raise ValueError(f"Le caisson {new_parent} fait partie de la branche du caisson {idx}.")
+    old_parent = get_parent(scene_cabinets, idx)
+    if old_parent is not None: children[old_parent].remove(idx)
+    caisson = scene_cabinets[idx]
+    caisson['parent_index'] = new_parent
+    caisson['attachment_dir'] = attachment_dir if new_parent is not None else None
+    if new_parent is not None:
+        children[new_parent].append(idx)
+        base_name = caisson.get('name', f"Caisson {idx}").split(' (')[0]
+        caisson['name'] = f"{base_name} ({ATTACHMENT_LABELS.get(attachment_dir, attachment_dir)} de {new_parent})"
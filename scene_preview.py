@@ -0,0 +1,172 @@
+# Contenu de scene_preview.py
+# Géométrie de la prévisualisation 3D : pièces de chaque caisson (corps, portes, tiroirs, étagères) et pieds,
+# regroupées par matériau dans un MeshBatch (quelques Mesh3d pour toute la scène).
+# Pour l'affichage, la scène est découpée en blocs de caissons versionnés (preview_trace_blocks) :
+# seuls les blocs modifiés sont renvoyés au navigateur (voir preview_component.py).
+
+import hashlib
+from geometry_helpers import MeshBatch
+from machining_plans import cabinet_state_hash
+from shared_cache import LRUCache
+
+BODY_COLOR = "#D6C098"
+ACCESSORY_COLOR = "#B8A078"
+FOOT_COLOR = "#333"
+BODY_OPACITY = 1.0
+ACCESSORY_OPACITY = 1.0
+MATERIALS = {
+    'body': (BODY_COLOR, BODY_OPACITY),
+    'accessory': (ACCESSORY_COLOR, ACCESSORY_OPACITY),
+    'foot': (FOOT_COLOR, 1.0),
+}
+FOOT_RADIUS = 0.02
+FOOT_INSET = 0.05
+# Niveau de détail : 'detail' (toutes les pièces), 'overview' (enveloppe et façades), 'auto' (overview au-delà du seuil)
+LOD_LABELS = {'auto': "Auto", 'detail': "Détail", 'overview': "Vue d'ensemble"}
+LOD_AUTO_THRESHOLD = 30
+# Registre des géométries par caisson, clés = contenu (voir _geometry_key)
+GEOMETRY_CACHE_SIZE = 4096
+_geometry_cache = LRUCache(max_entries=GEOMETRY_CACHE_SIZE)
+# Caissons par bloc de traces : modifier un caisson ne renvoie que les Mesh3d de son bloc
+PREVIEW_BLOCK_SIZE = 16
+
+def _part(label, material, size, origin, rotation=None):
+    # rotation : (angle en degrés, axe, pivot) ou None
+    return {'label': label, 'material': material, 'size': size, 'origin': origin, 'rotation': rotation}
+
+def resolve_lod(lod, n_cabinets):
+    """Niveau effectif ('detail' ou 'overview') pour une scène de n_cabinets caissons."""
+    if lod == 'auto': return 'overview' if n_cabinets > LOD_AUTO_THRESHOLD else 'detail'
+    return lod
+
+def cabinet_parts(cab, i, o, unit_factor, foot_height, has_feet, detail=True):
+    """
+    Pièces (cuboïdes) d'un caisson dont l'origine absolue est o, dans l'ordre de la prévisualisation.
+    detail=False : le corps est réduit à son enveloppe (un cuboïde), sans étagères ; les façades sont conservées.
+    """
+    d = cab['dims']; L, W, H = d['L_raw']*unit_factor, d['W_raw']*unit_factor, d['H_raw']*unit_factor
+    tl, tb, tt = d['t_lr_raw']*unit_factor, d['t_fb_raw']*unit_factor, d['t_tb_raw']*unit_factor
+    name = f"Caisson {i}"
+    if detail:
+        parts = [
+            _part(f"{name} - Traverse Bas", 'body', (L-2*tl, W, tt), (o[0]+tl, o[1], o[2])),
+            _part(f"{name} - Traverse Haut", 'body', (L-2*tl, W, tt), (o[0]+tl, o[1], o[2]+H-tt)),
+            _part(f"{name} - Montant Gauche", 'body', (tl, W, H), (o[0], o[1], o[2])),
+            _part(f"{name} - Montant Droit", 'body', (tl, W, H), (o[0]+L-tl, o[1], o[2])),
+            _part(f"{name} - Panneau Arrière", 'body', (L-2*tl, tb, H-2*tt), (o[0]+tl, o[1]+W-tb, o[2]+tt)),
+        ]
+    else:
+        parts = [_part(name, 'body', (L, W, H), (o[0], o[1], o[2]))]
+
+    if cab['door_props']['has_door']:
+        dp = cab['door_props']; gap = dp['door_gap'] * unit_factor; thk = dp.get('door_thickness', 19.0) * unit_factor; dy = o[1] - thk
+        dH = H + foot_height*unit_factor - gap if dp.get('door_model')=='floor_length' and (i==0) and has_feet else H - 2*gap
+        dz = o[2] + (gap * (1.0 if dp.get('door_model')=='standard' else 0.0))
+        rot_angle = -45 if dp.get('door_opening')=='right' else 45
+        if dp.get('door_type') == 'single':
+            pivot_x = o[0] + L - gap if dp.get('door_opening')=='right' else o[0] + gap
+            parts.append(_part(f"Porte {i}", 'accessory', (L-2*gap, thk, dH), (o[0]+gap, dy, dz), (rot_angle, 'z', (pivot_x, dy, dz))))
+        else:
+            dl_half = (L-2*gap)/2; pivot_g = o[0] + gap; pivot_d = o[0] + L - gap
+            parts.append(_part(f"Porte G {i}", 'accessory', (dl_half, thk, dH), (o[0]+gap, dy, dz), (45, 'z', (pivot_g, dy, dz))))
+            parts.append(_part(f"Porte D {i}", 'accessory', (dl_half, thk, dH), (o[0]+L-gap-dl_half, dy, dz), (-45, 'z', (pivot_d, dy, dz))))
+
+    if cab['drawer_props']['has_drawer']:
+        drp = cab['drawer_props']; gap = drp['drawer_gap'] * unit_factor; thk = drp.get('drawer_face_thickness', 19.0) * unit_factor
+        parts.append(_part(f"Tiroir {i}", 'accessory', (L-2*gap, thk, drp['drawer_face_H_raw']*unit_factor), (o[0]+gap, o[1]-thk, o[2]+drp['drawer_bottom_offset']*unit_factor)))
+
+    for s_idx, s in enumerate(cab.get('shelves', []) if detail else []):
+        sh_z = o[2] + tt + (s['height'] * unit_factor)
+        parts.append(_part(f"{name} - Etagère {s_idx+1}", 'body', (L-2*tl, W-0.01, s['thickness']*unit_factor), (o[0]+tl, o[1], sh_z)))
+    return parts
+
+def feet_positions(scene_cabinets, origins, unit_factor):
+    """Positions (x, y) des quatre pieds, aux coins de l'emprise de la scène."""
+    n = len(scene_cabinets)
+    min_L = min(origins[i][0] for i in range(n)); max_L = max(origins[i][0] + scene_cabinets[i]['dims']['L_raw']*unit_factor for i in range(n))
+    min_W = min(origins[i][1] for i in range(n)); max_W = max(origins[i][1] + scene_cabinets[i]['dims']['W_raw']*unit_factor for i in range(n))
+    return [(x, y) for x in [min_L+FOOT_INSET, max_L-FOOT_INSET] for y in [min_W+FOOT_INSET, max_W-FOOT_INSET]]
+
+def add_parts(batch, parts):
+    """Ajoute les pièces au lot : une génération vectorisée par matériau."""
+    by_material = {}
+    for p in parts: by_material.setdefault(p['material'], []).append(p)
+    for material, group in by_material.items():
+        color, opacity = MATERIALS[material]
+        rotations = [p['rotation'] or (0, 'z', p['origin']) for p in group]
+        batch.add_cuboids([p['size'] for p in group], [p['origin'] for p in group], color, opacity,
+                          labels=[p['label'] for p in group], angles=[r[0] for r in rotations],
+                          axes=[r[1] for r in rotations], pivots=[r[2] for r in rotations])
+
+def _geometry_key(cab, i, o, unit_factor, foot_height, has_feet, detail):
+    # L'index entre dans la clé : étiquettes « Caisson i » et porte toute hauteur du caisson 0
+    return (i, cabinet_state_hash(cab, foot_height), tuple(o), unit_factor, has_feet, detail)
+
+def _cabinet_batch(parts):
+    batch = MeshBatch()
+    add_parts(batch, parts)
+    return batch
+
+def get_cabinet_batch(cab, i, o, unit_factor, foot_height, has_feet, detail=True):
+    """
+    Lot de maillages d'un caisson, mémoïsé : seuls les caissons dont le contenu, l'origine ou le niveau de détail
+    ont changé sont régénérés. Le résultat est partagé : il ne doit pas être modifié par l'appelant.
+    """
+    key = _geometry_key(cab, i, o, unit_factor, foot_height, has_feet, detail)
+    return _geometry_cache.get_or_build(key, lambda: _cabinet_batch(cabinet_parts(cab, i, o, unit_factor, foot_height, has_feet, detail)))
+
+def _detail_flags(scene_cabinets, lod, selected):
+    overview = resolve_lod(lod, len(scene_cabinets)) == 'overview'
+    return [not overview or i == selected for i in range(len(scene_cabinets))]
+
+def build_scene_batch(scene_cabinets, origins, unit_factor, foot_height, has_feet, lod='detail', selected=None):
+    """MeshBatch de toute la scène : caissons puis pieds. En vue d'ensemble, seul le caisson sélectionné reste détaillé."""
+    batch = MeshBatch()
+    details = _detail_flags(scene_cabinets, lod, selected)
+    for i, cab in enumerate(scene_cabinets):
+        batch.extend(get_cabinet_batch(cab, i, origins[i], unit_factor, foot_height, has_feet, details[i]))
+    if has_feet and scene_cabinets:
+        fh = foot_height * unit_factor
+        color, opacity = MATERIALS['foot']
+        feet = feet_positions(scene_cabinets, origins, unit_factor)
+        batch.add_cylinders([(x, y, -fh) for x, y in feet], fh, FOOT_RADIUS, color, opacity,
+                            labels=[f"Pied {f_idx+1}" for f_idx in range(len(feet))])
+    return batch
+
+def preview_layout():
+    """Layout Plotly de la prévisualisation 3D (uirevision : la caméra est conservée d'une mise à jour à l'autre)."""
+    return dict(scene=dict(aspectmode='data', xaxis=dict(visible=True, showgrid=True, title="X"), yaxis=dict(visible=True, showgrid=True, title="Y"),
+                           zaxis=dict(visible=True, showgrid=True, title="Z"), camera=dict(eye=dict(x=1.6, y=1.6, z=1.4))),
+                margin=dict(l=0, r=0, t=0, b=0), uirevision='constant')
+
+def _version(value):
+    return hashlib.sha1(repr(value).encode()).hexdigest()
+
+def preview_trace_blocks(scene_cabinets, origins, unit_factor, foot_height, has_feet, lod='detail', selected=None):
+    """
+    Scène découpée pour l'affichage : [(clé, version, construction)], construction() -> traces Mesh3d du bloc.
+    Un bloc par groupe de PREVIEW_BLOCK_SIZE caissons, plus un bloc pour les pieds ; la version change
+    dès qu'un caisson du bloc change (contenu, origine, niveau de détail).
+    """
+    details = _detail_flags(scene_cabinets, lod, selected)
+    keys = [_geometry_key(cab, i, origins[i], unit_factor, foot_height, has_feet, details[i]) for i, cab in enumerate(scene_cabinets)]
+    blocks = []
+    for b0 in range(0, len(scene_cabinets), PREVIEW_BLOCK_SIZE):
+        members = range(b0, min(b0 + PREVIEW_BLOCK_SIZE, len(scene_cabinets)))
+        def build(members=members):
+            batch = MeshBatch()
+            for i in members:
+                batch.extend(get_cabinet_batch(scene_cabinets[i], i, origins[i], unit_factor, foot_height, has_feet, details[i]))
+            return batch.traces()
+        blocks.append((f"caissons-{b0 // PREVIEW_BLOCK_SIZE}", _version([keys[i] for i in members]), build))
+    if has_feet and scene_cabinets:
+        fh = foot_height * unit_factor
+        feet = feet_positions(scene_cabinets, origins, unit_factor)
+        def build_feet():
+            batch = MeshBatch()
+            color, opacity = MATERIALS['foot']
+            batch.add_cylinders([(x, y, -fh) for x, y in feet], fh, FOOT_RADIUS, color, opacity,
+                                labels=[f"Pied {f_idx+1}" for f_idx in range(len(feet))])
+            return batch.traces()
+        blocks.append(("pieds", _version((feet, fh)), build_feet))
+    return blocks
@@ -0,0 +1,75 @@
+# Contenu de shared_cache.py
+# Cache LRU de module, partagé par toutes les sessions Streamlit (un thread par session sur le même serveur).
+# Toutes les lectures / écritures passent par un verrou ; le plafond porte sur le nombre d'entrées
+# et, si une fonction de poids est donnée, sur leur taille totale (octets).
+
+import threading
+from collections import OrderedDict
+
+_MISSING = object()
+
+class LRUCache:
+    """
+    Cache LRU borné et verrouillé.
+    max_entries : nombre d'entrées maximal (None : pas de limite en nombre).
+    max_bytes, weigh : taille totale maximale et poids d'une valeur (ex. longueur de son JSON).
+    Une valeur plus lourde que max_bytes à elle seule n'est pas conservée.
+    """
+    def __init__(self, max_entries=None, max_bytes=None, weigh=None):
+        if max_entries is None and max_bytes is None:
+            raise ValueError("LRUCache sans plafond : donner max_entries et/ou max_bytes")
+        if max_bytes is not None and weigh is None:
+            raise ValueError("max_bytes demande une fonction de poids (weigh)")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.weigh = weigh
+        self._data = OrderedDict() # clé -> (valeur, poids)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING: return default
+            self._data.move_to_end(key)
+            return item[0]
+
+    def put(self, key, value):
+        weight = self.weigh(value) if self.weigh else 0
+        with self._lock:
+            old = self._data.pop(key, _MISSING)
+            if old is not _MISSING: self._bytes -= old[1]
+            if self.max_bytes is not None and weight > self.max_bytes: return
+            self._data[key] = (value, weight)
+            self._bytes += weight
+            while (self.max_entries is not None and len(self._data) > self.max_entries) or \
+                  (self.max_bytes is not None and self._bytes > self.max_bytes):
+                _, (_, w) = self._data.popitem(last=False)
+                self._bytes -= w
+
+    def get_or_build(self, key, build):
+        """
+        Valeur en cache, sinon build() puis mise en cache.
+        build() s'exécute hors du verrou : deux sessions peuvent construire la même valeur, la dernière est gardée.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = build()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
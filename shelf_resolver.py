@@ -0,0 +1,116 @@
+# Contenu de shelf_resolver.py
+# Recherche, sur la grille de 32 mm, des positions d'étagères mobiles sans conflit d'usinage.
+# Contraintes : tous les perçages des deux montants hors crémaillères (structure, étagères fixes, coulisses, charnières).
+
+import math
+from bisect import bisect_left, bisect_right
+from machining_logic import COLLISION_DIST, ZONE_MARGIN, round_to_closest_32
+from machining_plans import get_cabinet_machining_plan, get_plan_panel
+from parts_engine import DEFAULT_FOOT_HEIGHT
+from hole_set import RACK_STEP, SOURCES
+
+RACK_START = 50.0
+RACK_X_OFFSET = 37.0
+# Marge maximale d'un intervalle bloqué (voir _blocked_intervals), pour borner la recherche par dichotomie
+_MAX_MARGIN = max(COLLISION_DIST, ZONE_MARGIN)
+
+def _rack_extent(shelf):
+    """Nombre de rangées sous / au-dessus de la rangée centrale, None pour une crémaillère toute hauteur."""
+    m_type = shelf.get('mobile_machining_type', 'full_height')
+    if m_type == 'full_height': return None
+    if m_type == '5_holes_centered': return 2, 2
+    if m_type == 'custom_n_m': return shelf.get('custom_holes_below', 0), shelf.get('custom_holes_above', 0)
+    return 0, 0
+
+def _rack_span(y_center, extent, end_y):
+    """Première et dernière rangée de la crémaillère centrée sur y_center (bornées à [50, H - 50])."""
+    below, above = extent
+    lo = max(RACK_START, y_center - below * RACK_STEP)
+    hi = y_center + RACK_STEP * min(above, math.floor((end_y - y_center) / RACK_STEP))
+    return lo, hi
+
+def _blocked_intervals(holes, x_front, x_back):
+    """
+    Intervalles de Y interdits aux rangées extrêmes d'une crémaillère, un par perçage fixe.
+    Marge de 5 mm (zone de sécurité), portée à la distance de collision pour les perçages proches en X des taquets.
+    """
+    intervals = []
+    for x, y in zip(holes.x.tolist(), holes.y.tolist()):
+        dx = min(abs(x - x_front), abs(x - x_back))
+        margin = max(ZONE_MARGIN, math.sqrt(COLLISION_DIST**2 - dx**2)) if dx < COLLISION_DIST else ZONE_MARGIN
+        intervals.append((y - margin, y + margin))
+    intervals.sort()
+    return [a for a, _ in intervals], [b for _, b in intervals]
+
+def resolve_shelf_conflicts(cabinet, cab_idx, foot_height=DEFAULT_FOOT_HEIGHT, catalog=None):
+    """
+    Replace toutes les étagères mobiles d'un caisson sur la position de la grille de 32 mm
+    la plus proche qui ne crée aucun conflit (recherche alternée vers le haut et vers le bas).
+    Retourne ({index étagère: nouvelle hauteur}, [index des étagères sans solution],
+    [index des crémaillères toute hauteur en conflit]).
+    Les étagères déjà sans conflit ne bougent pas. Les crémaillères toute hauteur ne sont pas déplaçables :
+    elles sont signalées si elles touchent un perçage fixe ou une autre crémaillère toute hauteur
+    (seul un passage à une crémaillère partielle, ex. '5_holes_centered', peut alors lever le conflit).
+    """
+    H_side = float(cabinet['dims']['H_raw'])
+    W = float(cabinet['dims']['W_raw'])
+    end_y = H_side - RACK_START
+    x_front, x_back = RACK_X_OFFSET, W - RACK_X_OFFSET
+
+    plan = get_cabinet_machining_plan(cabinet, cab_idx, foot_height, catalog)
+    mobile = SOURCES.code('shelf_mobile')
+    starts, ends = [], []
+    for role in ('montant_gauche', 'montant_droit'):
+        holes = get_plan_panel(plan, role)['face_holes']
+        holes = holes.expanded()
+        fixed = holes.filter(holes.source != mobile)
+        s, e = _blocked_intervals(fixed, x_front, x_back)
+        starts += s; ends += e
+    order = sorted(range(len(starts)), key=starts.__getitem__)
+    starts, ends = [starts[i] for i in order], [ends[i] for i in order]
+
+    def free_of_holes(lo, hi):
+        # Intervalles dont le début est dans [lo - 2 * marge max, hi] : les seuls qui peuvent toucher [lo, hi]
+        a, b = bisect_left(starts, lo - 2 * _MAX_MARGIN), bisect_right(starts, hi)
+        return all(ends[i] < lo for i in range(a, b))
+
+    shelves = cabinet.get('shelves', [])
+    placed = [] # (lo, hi) des crémaillères déjà positionnées
+    movable, blocked = [], []
+    full_span = (RACK_START, RACK_START + RACK_STEP * math.floor((end_y - RACK_START) / RACK_STEP))
+    for s_idx, shelf in enumerate(shelves):
+        if shelf.get('shelf_type', 'mobile') != 'mobile': continue
+        extent = _rack_extent(shelf)
+        if extent is None:
+            if end_y < RACK_START: continue # Caisson trop bas : crémaillère vide
+            if placed or not free_of_holes(*full_span): blocked.append(s_idx)
+            placed.append(full_span)
+        else: movable.append((s_idx, extent))
+
+    def free_of_racks(lo, hi):
+        return all(hi + ZONE_MARGIN < p_lo or lo - ZONE_MARGIN > p_hi for p_lo, p_hi in placed)
+
+    moves, unresolved = {}, []
+    n_steps = int((end_y - RACK_START) // RACK_STEP) + 1
+    for s_idx, extent in sorted(movable, key=lambda m: shelves[m[0]]['height']):
+        shelf = shelves[s_idx]
+        th = shelf.get('thickness', 19.0)
+        current = round_to_closest_32(shelf['height'] + th / 2.0)
+        k0 = int(round((current - RACK_START) / RACK_STEP))
+        found = None
+        for d in range(n_steps + abs(k0) + 1):
+            for k in ((k0 + d, k0 - d) if d else (k0,)):
+                y_c = RACK_START + k * RACK_STEP
+                if k < 0 or y_c > end_y: continue
+                lo, hi = _rack_span(y_c, extent, end_y)
+                if free_of_holes(lo, hi) and free_of_racks(lo, hi):
+                    found = (y_c, lo, hi)
+                    break
+            if found: break
+        if found is None:
+            unresolved.append(s_idx)
+            continue
+        y_c, lo, hi = found
+        placed.append((lo, hi))
+        if y_c != current: moves[s_idx] = y_c - th / 2.0
+    return moves, unresolved, blocked
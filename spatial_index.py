@@ -0,0 +1,76 @@
+# Contenu de spatial_index.py
+# Index spatial (grille uniforme) des boîtes englobantes des caissons, pour détecter les caissons qui se chevauchent.
+# Mise à jour incrémentale : seules les boîtes modifiées sont réinsérées et interrogées.
+
+import math
+
+GRID_CELL_MM = 600.0 # Taille de cellule : de l'ordre d'un caisson standard
+OVERLAP_EPS = 1e-9 # Deux faces en contact ne sont pas un chevauchement (tolérance d'arrondi)
+
+def boxes_overlap(a, b, eps=OVERLAP_EPS):
+    """Chevauchement strict de deux boîtes ((x0, y0, z0), (x1, y1, z1)) : un volume commun non nul."""
+    (a0, a1), (b0, b1) = a, b
+    return all(a0[k] < b1[k] - eps and b0[k] < a1[k] - eps for k in range(3))
+
+def cabinet_boxes(scene_cabinets, origins, unit_factor):
+    """Boîte englobante absolue du corps de chaque caisson (mêmes unités que les origines)."""
+    boxes = []
+    for i, cab in enumerate(scene_cabinets):
+        x, y, z = origins[i]
+        d = cab['dims']
+        boxes.append(((x, y, z), (x + d['L_raw'] * unit_factor, y + d['W_raw'] * unit_factor, z + d['H_raw'] * unit_factor)))
+    return boxes
+
+class AABBGrid:
+    """Grille uniforme : chaque boîte est inscrite dans toutes les cellules qu'elle recouvre."""
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.boxes = {}     # id -> boîte
+        self.cells = {}     # (i, j, k) -> ids
+        self.overlaps = {}  # id -> ids des boîtes chevauchées
+
+    def _cells_of(self, box):
+        lo, hi = box
+        r = [range(math.floor(lo[k] / self.cell_size), math.floor(hi[k] / self.cell_size) + 1) for k in range(3)]
+        return [(i, j, k) for i in r[0] for j in r[1] for k in r[2]]
+
+    def query(self, box, exclude=None):
+        """Ids des boîtes qui chevauchent 'box' (triés)."""
+        found = set()
+        for cell in self._cells_of(box):
+            for other in self.cells.get(cell, ()):
+                if other != exclude and other not in found and boxes_overlap(box, self.boxes[other]):
+                    found.add(other)
+        return sorted(found)
+
+    def remove(self, item):
+        box = self.boxes.pop(item, None)
+        if box is None: return
+        for cell in self._cells_of(box):
+            members = self.cells[cell]
+            members.discard(item)
+            if not members: del self.cells[cell]
+        for other in self.overlaps.pop(item, ()):
+            self.overlaps[other].discard(item)
+
+    def insert(self, item, box):
+        """Ajoute (ou remplace) une boîte ; retourne les ids qu'elle chevauche."""
+        self.remove(item)
+        hits = self.query(box, exclude=item)
+        self.boxes[item] = box
+        for cell in self._cells_of(box):
+            self.cells.setdefault(cell, set()).add(item)
+        self.overlaps[item] = set(hits)
+        for other in hits: self.overlaps[other].add(item)
+        return hits
+
+    def overlapping_pairs(self):
+        """Paires (a, b), a < b, de boîtes qui se chevauchent, triées."""
+        return sorted((a, b) for a, others in self.overlaps.items() for b in others if a < b)
+
+def sync_overlap_index(index, boxes):
+    """Met l'index en accord avec la liste de boîtes : seules les boîtes modifiées, ajoutées ou retirées sont traitées."""
+    for item in [i for i in index.boxes if i >= len(boxes)]: index.remove(item)
+    for i, box in enumerate(boxes):
+        if index.boxes.get(i) != box: index.insert(i, box)
+    return index.overlapping_pairs()
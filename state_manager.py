@@ -8,6 +8,9 @@ import datetime
 import copy
 from utils import get_default_debit_data, get_default_shelf_props, get_default_door_props, get_default_drawer_props
 from project_definitions import get_default_dims_19, get_default_door_props_19, get_default_drawer_props_19
+from shelf_resolver import resolve_shelf_conflicts
+from hardware_catalog import get_catalog, get_default_catalog, parse_catalog
+from scene_graph import build_children_index, delete_subtree, reparent
 
 def get_selected_cabinet():
     idx = st.session_state.get('selected_cabinet_index')
@@ -19,6 +22,11 @@ def initialize_session_state():
     st.session_state.setdefault('scene_cabinets', [])
     st.session_state.setdefault('selected_cabinet_index', None)
     st.session_state.setdefault('base_cabinet_index', 0)
+    st.session_state.setdefault('parts_cache', {})
+    st.session_state.setdefault('origins_cache', {})
+    st.session_state.setdefault('origins_dirty', set())
+    st.session_state.setdefault('overlap_index', None)
+    st.session_state.setdefault('scene_children', None)
     st.session_state.setdefault('unit_select', 'mm')
 
     # Infos Globales du Projet
@@ -37,6 +45,9 @@ def initialize_session_state():
     # Propriétés des pieds
     st.session_state.setdefault('has_feet', False)
     st.session_state.setdefault('foot_height', 80.0) 
+    st.session_state.setdefault('lod_mode', 'auto')
+    st.session_state.setdefault('hardware_catalog', None) # Contenu du catalogue de quincaillerie (None : défaut)
+    st.session_state.setdefault('catalog_error', None)
     st.session_state.setdefault('foot_diameter', 30.0)
 
 def load_save_state():
@@ -63,6 +74,10 @@ def load_save_state():
                     st.session_state['foot_height'] = loaded_data.get('foot_height', 80.0)
                     st.session_state['foot_diameter'] = loaded_data.get('foot_diameter', 50.0)
                     st.session_state['scene_cabinets'] = loaded_data.get('scene_cabinets', [])
+                    st.session_state['hardware_catalog'] = loaded_data.get('hardware_catalog')
+                    st.session_state['catalog_error'] = None
+                    st.session_state['scene_children'] = None
+                    mark_cabinet_dirty()
                     if st.session_state['scene_cabinets']:
                         st.session_state['selected_cabinet_index'] = 0
                         st.session_state['base_cabinet_index'] = 0
@@ -74,11 +89,33 @@ def load_save_state():
         except Exception as e:
             st.error(f"Erreur chargement : {e}")
 
+def get_children_index():
+    """Index parent -> enfants de la scène, maintenu par les callbacks (reconstruit s'il est absent ou périmé)."""
+    children = st.session_state.get('scene_children')
+    if children is None or len(children) != len(st.session_state['scene_cabinets']):
+        children, _ = build_children_index(st.session_state['scene_cabinets'])
+        st.session_state['scene_children'] = children
+    return children
+
+def mark_cabinet_dirty(idx=None):
+    """Invalide les pièces calculées et l'origine (avec son sous-arbre) d'un caisson (None : toute la scène)."""
+    cache = st.session_state.setdefault('parts_cache', {})
+    dirty = st.session_state.get('origins_dirty', set())
+    if idx is None:
+        cache.clear()
+        st.session_state['origins_dirty'] = None
+    else:
+        cache.pop(idx, None)
+        if dirty is not None: dirty.add(idx)
+        st.session_state['origins_dirty'] = dirty
+
 # Callbacks
 def update_selected_cabinet_dim(key):
     cabinet = get_selected_cabinet()
     widget_key = f"{key}_{st.session_state.selected_cabinet_index}"
-    if cabinet and widget_key in st.session_state: cabinet['dims'][key] = st.session_state[widget_key]
+    if cabinet and widget_key in st.session_state:
+        cabinet['dims'][key] = st.session_state[widget_key]
+        mark_cabinet_dirty(st.session_state.selected_cabinet_index)
 
 def update_selected_cabinet_door(key):
     cabinet = get_selected_cabinet()
@@ -88,6 +125,7 @@ def update_selected_cabinet_door(key):
         cabinet['door_props'][key] = st.session_state[widget_key]
         if key == 'has_door' and st.session_state[widget_key] is True:
             if 'drawer_props' in cabinet: cabinet['drawer_props']['has_drawer'] = False
+        mark_cabinet_dirty(st.session_state.selected_cabinet_index)
 
 def update_selected_cabinet_drawer(key):
     cabinet = get_selected_cabinet()
@@ -97,12 +135,14 @@ def update_selected_cabinet_drawer(key):
         cabinet['drawer_props'][key] = st.session_state[widget_key]
         if key == 'has_drawer' and st.session_state[widget_key] is True:
             if 'door_props' in cabinet: cabinet['door_props']['has_drawer'] = False
+        mark_cabinet_dirty(st.session_state.selected_cabinet_index)
 
 def add_shelf_callback():
     cabinet = get_selected_cabinet()
     if cabinet:
         if 'shelves' not in cabinet: cabinet['shelves'] = []
         cabinet['shelves'].append(get_default_shelf_props())
+        mark_cabinet_dirty(st.session_state.selected_cabinet_index)
 
 def update_shelf_prop(shelf_index, key):
     cabinet = get_selected_cabinet()
@@ -114,32 +154,110 @@ def update_shelf_prop(shelf_index, key):
     elif key == 'custom_holes_below': widget_key = f"shelf_c_below_{st.session_state.selected_cabinet_index}_{shelf_index}"
     else: widget_key = f"shelf_{key[0]}_{st.session_state.selected_cabinet_index}_{shelf_index}"
     if cabinet and widget_key in st.session_state:
-        if 'shelves' in cabinet and shelf_index < len(cabinet['shelves']): cabinet['shelves'][shelf_index][key] = st.session_state[widget_key]
+        if 'shelves' in cabinet and shelf_index < len(cabinet['shelves']):
+            cabinet['shelves'][shelf_index][key] = st.session_state[widget_key]
+            mark_cabinet_dirty(st.session_state.selected_cabinet_index)
 
 def delete_shelf_callback(shelf_index):
     cabinet = get_selected_cabinet()
     if cabinet:
         if 'shelves' in cabinet and shelf_index < len(cabinet['shelves']):
             cabinet['shelves'].pop(shelf_index)
+            mark_cabinet_dirty(st.session_state.selected_cabinet_index)
             st.rerun()
 
+def reparent_selected_cabinet():
+    """Déplace la branche du caisson sélectionné sous un autre caisson (widgets 'reparent_target' / 'reparent_dir')."""
+    idx = st.session_state.get('selected_cabinet_index')
+    target = st.session_state.get('reparent_target')
+    if idx is None or target is None or idx >= len(st.session_state['scene_cabinets']): return
+    try:
+        reparent(st.session_state['scene_cabinets'], get_children_index(), idx, target, st.session_state.get('reparent_dir', 'right'))
+    except ValueError as e:
+        st.error(str(e))
+        return
+    mark_cabinet_dirty(idx)
+
+CATALOG_ERROR = "Catalogue de quincaillerie illisible : catalogue par défaut utilisé."
+
+def get_session_catalog():
+    """Catalogue de quincaillerie du projet : (catalogue, message d'erreur ou None)."""
+    try:
+        return get_catalog(st.session_state.get('hardware_catalog')), st.session_state.get('catalog_error')
+    except (ValueError, KeyError, TypeError, AttributeError):
+        # Contenu enregistré invalide (projet ancien ou modifié à la main)
+        return get_default_catalog(), CATALOG_ERROR
+
+def load_catalog_upload():
+    """Charge le catalogue téléversé (st.file_uploader 'catalog_loader') ; le catalogue en place est gardé s'il est invalide."""
+    uploaded_file = st.session_state.get('catalog_loader')
+    if uploaded_file is None:
+        st.session_state['catalog_error'] = None
+        return
+    try:
+        catalog = parse_catalog(uploaded_file.getvalue())
+    except ValueError:
+        st.session_state['catalog_error'] = "Fichier refusé : ce n'est pas un catalogue de quincaillerie valide (JSON)."
+        return
+    st.session_state['hardware_catalog'] = catalog.data
+    st.session_state['catalog_error'] = None
+
+def reset_catalog_callback():
+    st.session_state['hardware_catalog'] = None
+    st.session_state['catalog_error'] = None
+
+def resolve_shelf_conflicts_callback(cab_idx):
+    """
+    Replace en une fois toutes les étagères mobiles du caisson sur des positions sans conflit.
+    Le résultat (étagères déplacées, sans solution, crémaillères toute hauteur bloquantes) est gardé
+    dans st.session_state['shelf_resolution'] pour l'affichage.
+    """
+    cabinets = st.session_state['scene_cabinets']
+    if cab_idx is None or cab_idx >= len(cabinets): return
+    moves, unresolved, blocked = resolve_shelf_conflicts(cabinets[cab_idx], cab_idx, st.session_state.foot_height, get_session_catalog()[0])
+    for shelf_index, height in moves.items():
+        cabinets[cab_idx]['shelves'][shelf_index]['height'] = height
+        st.session_state[f"shelf_h_{cab_idx}_{shelf_index}"] = height
+    if moves: mark_cabinet_dirty(cab_idx)
+    st.session_state['shelf_resolution'] = {cab_idx: {'moved': sorted(moves), 'unresolved': unresolved, 'blocked': blocked}}
+
+def make_racks_movable_callback(cab_idx, shelf_indices):
+    """Passe les crémaillères toute hauteur indiquées en 5 trous centrés, puis relance le placement automatique."""
+    cabinets = st.session_state['scene_cabinets']
+    if cab_idx is None or cab_idx >= len(cabinets): return
+    shelves = cabinets[cab_idx].get('shelves', [])
+    for shelf_index in shelf_indices:
+        if shelf_index < len(shelves):
+            shelves[shelf_index]['mobile_machining_type'] = '5_holes_centered'
+            st.session_state[f"shelf_m_type_{cab_idx}_{shelf_index}"] = '5_holes_centered'
+    mark_cabinet_dirty(cab_idx)
+    resolve_shelf_conflicts_callback(cab_idx)
+
 def update_selected_cabinet_material(key):
     cabinet = get_selected_cabinet()
     widget_key = f"{key}_{st.session_state.selected_cabinet_index}"
-    if cabinet and widget_key in st.session_state: cabinet[key] = st.session_state[widget_key]
+    if cabinet and widget_key in st.session_state:
+        cabinet[key] = st.session_state[widget_key]
+        mark_cabinet_dirty(st.session_state.selected_cabinet_index)
 def update_selected_cabinet_door_material(key):
     cabinet = get_selected_cabinet()
     widget_key = f"door_{key}_{st.session_state.selected_cabinet_index}"
-    if cabinet and widget_key in st.session_state: cabinet['door_props']['material'] = st.session_state[widget_key]
+    if cabinet and widget_key in st.session_state:
+        cabinet['door_props']['material'] = st.session_state[widget_key]
+        mark_cabinet_dirty(st.session_state.selected_cabinet_index)
 def update_selected_cabinet_drawer_material(key):
     cabinet = get_selected_cabinet()
     widget_key = f"drawer_{key}_{st.session_state.selected_cabinet_index}"
-    if cabinet and widget_key in st.session_state: cabinet['drawer_props']['material'] = st.session_state[widget_key]
+    if cabinet and widget_key in st.session_state:
+        cabinet['drawer_props']['material'] = st.session_state[widget_key]
+        mark_cabinet_dirty(st.session_state.selected_cabinet_index)
 def update_shelf_material(shelf_index, key):
     widget_key = f"shelf_m_{st.session_state.selected_cabinet_index}_{shelf_index}"
     cabinet = get_selected_cabinet()
     if cabinet and widget_key in st.session_state:
-        if 'shelves' in cabinet and shelf_index < len(cabinet['shelves']): cabinet['shelves'][shelf_index]['material'] = st.session_state[widget_key]
+        if 'shelves' in cabinet and shelf_index < len(cabinet['shelves']):
+            cabinet['shelves'][shelf_index]['material'] = st.session_state[widget_key]
+            mark_cabinet_dirty(st.session_state.selected_cabinet_index)
 
 def add_cabinet(origin_type='central'):
     if origin_type == 'central':
@@ -167,37 +285,27 @@ def add_cabinet(origin_type='central'):
         elif origin_type == 'left': new_name = f"G de {base_index}"
         else: new_name = f"H de {base_index}"
         new_cabinet['name'] = f"Caisson {len(st.session_state['scene_cabinets'])} ({new_name})"
+        children = get_children_index()
         st.session_state['scene_cabinets'].append(new_cabinet)
         new_index = len(st.session_state['scene_cabinets']) - 1
+        children.append([])
+        children[base_index].append(new_index)
         st.session_state['selected_cabinet_index'] = new_index
         st.session_state['base_cabinet_index'] = st.session_state['selected_cabinet_index']
 
 def clear_scene():
     st.session_state['scene_cabinets'] = []
+    st.session_state['scene_children'] = None
+    mark_cabinet_dirty()
     st.session_state['selected_cabinet_index'] = None
     st.session_state['base_cabinet_index'] = 0
 
 def delete_selected_cabinet():
     idx = st.session_state.get('selected_cabinet_index')
     if idx is None or idx >= len(st.session_state['scene_cabinets']): return
-    indices_to_remove = set()
-    queue = [idx]
-    while queue:
-        curr = queue.pop()
-        if curr not in indices_to_remove:
-            indices_to_remove.add(curr)
-            for i, c in enumerate(st.session_state['scene_cabinets']):
-                if c['parent_index'] == curr: queue.append(i)
-    new_scene = []
-    map_old_new = {}
-    counter = 0
-    for i, c in enumerate(st.session_state['scene_cabinets']):
-        if i not in indices_to_remove:
-            map_old_new[i] = counter
-            new_scene.append(c)
-            counter += 1
-    for c in new_scene:
-        if c['parent_index'] is not None: c['parent_index'] = map_old_new.get(c['parent_index'], None) 
+    new_scene, new_children, _ = delete_subtree(st.session_state['scene_cabinets'], get_children_index(), idx)
     st.session_state['scene_cabinets'] = new_scene
+    st.session_state['scene_children'] = new_children
+    mark_cabinet_dirty()
     st.session_state['selected_cabinet_index'] = 0 if new_scene else None
     st.session_state['base_cabinet_index'] = 0
@@ -1,5 +1,4 @@
 import streamlit as st
-import datetime
 import re
 
 def get_material_library():
@@ -62,29 +61,6 @@ def get_default_shelf_props():
         'custom_holes_below': 0
     }
 
-def initialize_session_state():
-    """Initialise l'état de session global."""
-    st.session_state.setdefault('scene_cabinets', [])
-    st.session_state.setdefault('selected_cabinet_index', None)
-    st.session_state.setdefault('base_cabinet_index', 0)
-    st.session_state.setdefault('audio_recorder_key', 'audio_key_1')
-    st.session_state.setdefault('unit_select', 'mm')
-
-    st.session_state.setdefault('project_name', "Nouveau Projet")
-    st.session_state.setdefault('corps_meuble', "Caisson 1")
-    st.session_state.setdefault('quantity', 1)
-    st.session_state.setdefault('client', "SYMETRY WHEELS")
-    st.session_state.setdefault('ref_chantier', "Le Marec")
-    st.session_state.setdefault('telephone', "06 42 89 98 58")
-    st.session_state.setdefault('date_souhaitee', datetime.date.today())
-    st.session_state.setdefault('panneau_decor', "ESSENTIAL OAK NATUREL")
-    st.session_state.setdefault('chant_mm', "1mm")
-    st.session_state.setdefault('decor_chant', "ESSENTIAL OAK NATUREL")
-    
-    st.session_state.setdefault('has_feet', False)
-    st.session_state.setdefault('foot_height', 80.0) 
-    st.session_state.setdefault('foot_diameter', 30.0)
-
 def calculate_hole_positions(W_raw):
     screw_positions = []
     dowel_positions = []